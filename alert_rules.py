@@ -0,0 +1,93 @@
+import bisect
+import itertools
+import threading
+
+DIRECTIONS = ('below', 'above')
+
+class RuleStore:
+    """Règles de seuil indexées par (crypto, direction) et triées par seuil
+
+    Quand le prix passe de p0 à p1, seules les règles dont le seuil est
+    franchi sont renvoyées, par deux recherches dichotomiques :
+
+    - baisse : les règles 'below' de seuil X avec p1 < X <= p0
+    - hausse : les règles 'above' de seuil Y avec p0 <= Y < p1
+
+    Sans prix précédent (p0 None), toutes les règles déjà vérifiées par p1
+    sont renvoyées. Les ajouts et suppressions marquent l'index à
+    reconstruire ; il est retrié une seule fois au prochain appel à match().
+    """
+
+    def __init__(self, rules=()):
+        self._rules = {}
+        self._buckets = {}
+        self._dirty = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.add_many(rules)
+
+    def __len__(self):
+        return len(self._rules)
+
+    def add(self, rule):
+        """Ajoute une règle {'crypto', 'direction', 'threshold', ...} et renvoie son id"""
+        return self.add_many([rule])[0]
+
+    def add_many(self, rules):
+        ids = []
+        with self._lock:
+            for rule in rules:
+                if rule['direction'] not in DIRECTIONS:
+                    raise ValueError(f"Direction d'alerte inconnue: {rule['direction']}")
+                rule_id = next(self._ids)
+                rule = dict(rule, id=rule_id, threshold=float(rule['threshold']))
+                self._rules[rule_id] = rule
+                self._dirty.add((rule['crypto'], rule['direction']))
+                ids.append(rule_id)
+        return ids
+
+    def remove(self, rule_id):
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is not None:
+                self._dirty.add((rule['crypto'], rule['direction']))
+        return rule
+
+    def cryptos(self):
+        return {crypto for crypto, _ in self._buckets} | {crypto for crypto, _ in self._dirty}
+
+    def _rebuild(self):
+        """Retrie les index modifiés depuis le dernier appel"""
+        if not self._dirty:
+            return
+        grouped = {key: [] for key in self._dirty}
+        for rule in self._rules.values():
+            key = (rule['crypto'], rule['direction'])
+            if key in grouped:
+                grouped[key].append(rule)
+        for key, rules in grouped.items():
+            if rules:
+                rules.sort(key=lambda r: r['threshold'])
+                self._buckets[key] = ([r['threshold'] for r in rules], rules)
+            else:
+                self._buckets.pop(key, None)
+        self._dirty.clear()
+
+    def match(self, crypto, p0, p1):
+        """Règles de `crypto` dont le seuil est franchi entre p0 et p1"""
+        with self._lock:
+            self._rebuild()
+            matched = []
+            below = self._buckets.get((crypto, 'below'))
+            above = self._buckets.get((crypto, 'above'))
+            if below and (p0 is None or p1 < p0):
+                thresholds, rules = below
+                lo = bisect.bisect_right(thresholds, p1)
+                hi = len(thresholds) if p0 is None else bisect.bisect_right(thresholds, p0)
+                matched.extend(rules[lo:hi])
+            if above and (p0 is None or p1 > p0):
+                thresholds, rules = above
+                lo = 0 if p0 is None else bisect.bisect_left(thresholds, p0)
+                hi = bisect.bisect_left(thresholds, p1)
+                matched.extend(rules[lo:hi])
+            return matched
@@ -1,15 +1,343 @@
+import os
+import json
+import time
+import queue
+import sqlite3
 import smtplib
+import threading
 from email.mime.text import MIMEText
+from config import DB_PATH, load_config
+from alert_rules import DIRECTIONS, RuleStore
+
+class SMTPPool:
+    """Connexion SMTP réutilisée entre les envois (reconnexion si coupée ou inactive)"""
+
+    def __init__(self, host, port, sender, username='', password='', ssl=True, starttls=False,
+                 idle_timeout=300, timeout=30):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.ssl = ssl
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._server = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, smtp_config):
+        """Construit le pool à partir de la section `smtp` de config.yaml"""
+        password = smtp_config.get('password') or os.environ.get(smtp_config.get('password_env', ''), '')
+        return cls(
+            host=smtp_config.get('host', 'localhost'),
+            port=smtp_config.get('port', 465),
+            sender=smtp_config.get('sender', ''),
+            username=smtp_config.get('username', ''),
+            password=password,
+            ssl=smtp_config.get('ssl', True),
+            starttls=smtp_config.get('starttls', False),
+            idle_timeout=smtp_config.get('idle_timeout', 300),
+        )
+
+    def _connect(self):
+        if self.ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        return server
+
+    def _get_server(self):
+        """Renvoie la connexion ouverte, ou en ouvre une nouvelle si besoin"""
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def send(self, to_emails, subject, body):
+        """Envoie un message ; la connexion est fermée en cas d'erreur pour être recréée"""
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = ', '.join(to_emails)
+        with self._lock:
+            try:
+                self._get_server().send_message(msg)
+                self._last_used = time.monotonic()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+                raise
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+class AlertEngine:
+    """Évalue les règles d'alerte et les envoie via une file asynchrone
+
+    Une règle se déclenche quand le prix, dans la devise de la règle,
+    franchit son seuil entre deux évaluations (ou, à la première
+    évaluation, si le prix est déjà du bon côté du seuil). Les alertes sont dédupliquées par règle et soumises à
+    un délai de refroidissement, puis un thread d'envoi les regroupe en
+    digests par destinataire et réessaie avec un délai exponentiel.
+
+    Avec `db_path`, les derniers prix vus et les dates de dernier envoi
+    sont conservés en base (tables alert_last_prices / alert_last_sent) :
+    un collecteur lancé une fois par cycle retrouve l'état du cycle
+    précédent, sans redéclencher les règles ni ignorer le refroidissement.
+    """
+
+    def __init__(self, rules, pool, recipients, cooldown=3600, digest_window=30,
+                 max_retries=5, retry_backoff=2.0, db_path=None):
+        # Un index par devise : chaque règle est comparée au prix dans sa devise
+        self.rules = {}
+        for rule in rules:
+            rule = dict(rule, currency=rule.get('currency', 'eur'))
+            self.rules.setdefault(rule['currency'], RuleStore()).add(rule)
+        self._last_prices = {}
+        self.pool = pool
+        self.recipients = recipients
+        self.cooldown = cooldown
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue()
+        self._last_sent = {}
+        self._worker = None
+        self.sent_digests = 0
+        self.failed_digests = 0
+        self.db_path = db_path
+        if db_path:
+            self._load_state()
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construit le moteur à partir de config.yaml"""
+        config = config or load_config()
+        alerts_config = config.get('alerts', {})
+        return cls(
+            rules=rules_from_config(config),
+            pool=SMTPPool.from_config(config.get('smtp', {})),
+            recipients=alerts_config.get('recipients', []),
+            cooldown=alerts_config.get('cooldown', 3600),
+            digest_window=alerts_config.get('digest_window', 30),
+            max_retries=alerts_config.get('max_retries', 5),
+            retry_backoff=alerts_config.get('retry_backoff', 2),
+            db_path=DB_PATH,
+        )
+
+    def _load_state(self):
+        conn = sqlite3.connect(self.db_path)
+        init_alert_state(conn)
+        self._last_prices = {(crypto, currency): price for crypto, currency, price in
+                             conn.execute('SELECT crypto, currency, price FROM alert_last_prices')}
+        self._last_sent = {tuple(json.loads(key)): sent_at for key, sent_at in
+                           conn.execute('SELECT rule_key, sent_at FROM alert_last_sent')}
+        conn.close()
+
+    def _save_state(self, sent_keys):
+        """Enregistre les prix vus et les envois du cycle"""
+        conn = sqlite3.connect(self.db_path)
+        init_alert_state(conn)
+        conn.executemany('INSERT OR REPLACE INTO alert_last_prices VALUES (?, ?, ?)',
+                         [(crypto, currency, price) for (crypto, currency), price in self._last_prices.items()])
+        conn.executemany('INSERT OR REPLACE INTO alert_last_sent VALUES (?, ?)',
+                         [(json.dumps(list(key)), self._last_sent[key]) for key in sent_keys])
+        conn.commit()
+        conn.close()
+
+    def start(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='alert-engine', daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Vide la file (envoi du dernier digest) puis arrête le thread d'envoi"""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout)
+        self.pool.close()
+
+    def evaluate(self, snapshot, now=None):
+        """Évalue les règles et met en file les alertes déclenchées
+
+        `snapshot` : cotations multi-devises {crypto: {devise: {'price', 'change_24h'}}}
+        telles que renvoyées par data_collector.fetch_price_snapshot.
+        """
+        now = time.time() if now is None else now
+        triggered = 0
+        sent_keys = []
+        for currency, store in self.rules.items():
+            for crypto in store.cryptos():
+                price = snapshot.get(crypto, {}).get(currency, {}).get('price')
+                if not price:
+                    continue
+                previous = self._last_prices.get((crypto, currency))
+                self._last_prices[(crypto, currency)] = price
+                for rule in store.match(crypto, previous, price):
+                    if self._should_send(rule, now):
+                        self._queue.put(_make_alert(rule, price, self.recipients))
+                        sent_keys.append(rule_key(rule))
+                        triggered += 1
+        if self.db_path:
+            self._save_state(sent_keys)
+        return triggered
+
+    def _should_send(self, rule, now):
+        """Déduplication et refroidissement par règle"""
+        key = rule_key(rule)
+        last = self._last_sent.get(key)
+        if last is not None and now - last < self.cooldown:
+            return False
+        self._last_sent[key] = now
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            # Regrouper les alertes arrivant pendant la fenêtre de digest
+            deadline = time.monotonic() + self.digest_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        """Un digest par destinataire, une seule ligne par règle"""
+        by_recipient = {}
+        for alert in batch:
+            for recipient in alert['recipients']:
+                by_recipient.setdefault(recipient, {})[alert['key']] = alert
+        for recipient, alerts in by_recipient.items():
+            alerts = list(alerts.values())
+            if len(alerts) == 1:
+                subject, body = alerts[0]['subject'], alerts[0]['body']
+            else:
+                subject = f"Alertes crypto ({len(alerts)})"
+                body = '\n'.join(f"- {alert['body']}" for alert in alerts)
+            self._send_with_retry([recipient], subject, body)
+
+    def _send_with_retry(self, to_emails, subject, body):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.pool.send(to_emails, subject, body)
+                self.sent_digests += 1
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Échec d'envoi de l'alerte à {', '.join(to_emails)}: {e}")
+                    self.failed_digests += 1
+                    return False
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+def init_alert_state(conn):
+    """Crée les tables d'état du moteur d'alertes (derniers prix, derniers envois)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS alert_last_prices (
+            crypto TEXT,
+            currency TEXT,
+            price REAL,
+            PRIMARY KEY (crypto, currency)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS alert_last_sent (
+            rule_key TEXT PRIMARY KEY,
+            sent_at REAL
+        )
+    ''')
+    conn.commit()
+
+def rule_key(rule):
+    return (rule.get('email'), rule['crypto'], rule['direction'], rule['threshold'], rule['currency'])
+
+def _make_alert(rule, price, default_recipients):
+    symbol = rule['crypto'].capitalize()
+    word = 'en dessous de' if rule['direction'] == 'below' else 'au-dessus de'
+    currency = rule['currency'].upper()
+    return {
+        'key': rule_key(rule),
+        'recipients': [rule['email']] if rule.get('email') else default_recipients,
+        'subject': f"Alerte {symbol}",
+        'body': f"{symbol} est {word} {rule['threshold']:,.0f} {currency} (prix actuel : {price:,.2f} {currency})",
+    }
+
+def rules_from_config(config):
+    """Règles d'alerte : alert_threshold global + section alerts.rules
+
+    La devise d'une règle doit faire partie des devises cotées par le
+    collecteur (`currencies` et `base_currency`).
+    """
+    base_currency = config.get('base_currency', 'eur')
+    currencies = set(config.get('currencies') or [config.get('currency', base_currency)]) | {base_currency}
+    rules = []
+    if config.get('alert_threshold') is not None:
+        rules.append({
+            'crypto': config.get('crypto', 'bitcoin'),
+            'direction': 'below',
+            'threshold': float(config['alert_threshold']),
+            'currency': config.get('currency', 'eur'),
+        })
+    for rule in config.get('alerts', {}).get('rules', []) or []:
+        if rule.get('direction', 'below') not in DIRECTIONS:
+            raise ValueError(f"Direction d'alerte inconnue: {rule.get('direction')}")
+        rules.append({
+            'crypto': rule['crypto'],
+            'direction': rule.get('direction', 'below'),
+            'threshold': float(rule['threshold']),
+            'currency': rule.get('currency', config.get('currency', 'eur')),
+            'email': rule.get('email'),
+        })
+    for rule in rules:
+        if rule['currency'] not in currencies:
+            raise ValueError(f"Devise d'alerte non cotée par le collecteur: {rule['currency']}")
+    return rules
+
+_engine = None
+
+def get_alert_engine():
+    """Moteur d'alertes partagé du processus (démarré au premier appel)"""
+    global _engine
+    if _engine is None:
+        _engine = AlertEngine.from_config().start()
+    return _engine
+
+def evaluate_alerts(snapshot):
+    """Point d'entrée du collecteur : évalue les alertes sur les cotations multi-devises d'un cycle"""
+    return get_alert_engine().evaluate(snapshot)
 
 def send_email_alert(subject, body, to_email):
-    msg = MIMEText(body)
-    msg['Subject'] = subject
-    msg['From'] = "tonemail@gmail.com"
-    msg['To'] = to_email
-
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login("tonemail@gmail.com", "TON_MOT_DE_PASSE")
-        server.send_message(msg)
+    """Envoi direct d'un email avec les paramètres SMTP de config.yaml"""
+    pool = SMTPPool.from_config(load_config().get('smtp', {}))
+    try:
+        pool.send([to_email], subject, body)
+    finally:
+        pool.close()
 
 # Exemple
 # send_email_alert("Alerte BTC", "Bitcoin est en dessous de 20 000 EUR", "destinataire@gmail.com")
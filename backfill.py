@@ -0,0 +1,263 @@
+"""Détection des trous de la table `prices` et rattrapage en parallèle
+
+Pour chaque crypto, seuls les prix postérieurs au filigrane
+`scanned_until` (table `price_coverage`) sont relus : deux prix
+consécutifs plus espacés que `tolerance` fois le pas attendu délimitent
+un trou. Le pas attendu suit la granularité stockée : `interval` (horaire,
+comme les réponses market_chart sur 30 jours), puis journalière au-delà de
+`retention.hourly_days`.
+
+Les trous d'une crypto sont regroupés en un minimum de requêtes
+market_chart/range de `min_span_days` à `max_span_days` jours (en dehors,
+CoinGecko passe en granularité 5 min ou journalière), exécutées par un
+pool de `max_workers` threads. Les trous du palier journalier (plus vieux
+que `retention.hourly_days`) sont demandés par plages de plus de 90 jours,
+jusqu'à `daily_max_span_days` : la réponse est déjà journalière et la
+rétention n'a rien à resupprimer. Seuls les points tombant dans les trous
+sont stockés : les prix déjà en base autour ne sont pas dupliqués.
+
+Le filigrane avance jusqu'au premier trou encore ouvert. Un trou que
+l'API ne sait pas combler est abandonné après `max_attempts` essais
+(table `price_gaps`), pour que les scans suivants ne relisent que les
+données nouvelles.
+
+    python backfill.py             # scan, plan et rattrapage
+    python backfill.py --dry-run   # plan seul
+    python backfill.py --rescan    # ignore les filigranes (scan complet)
+"""
+import argparse
+import datetime
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import metrics
+from config import DB_PATH, load_config
+from data_collector import CRYPTOS, MAX_WORKERS, fetch_range_arrays, store_price_arrays
+from price_snapshot import publish_snapshot
+from retention import HOURLY_DAYS
+
+BACKFILL = load_config().get('backfill', {})
+INTERVAL = BACKFILL.get('interval', 3600)
+TOLERANCE = BACKFILL.get('tolerance', 2)
+MAX_SPAN = pd.Timedelta(days=BACKFILL.get('max_span_days', 90))
+MIN_SPAN = pd.Timedelta(days=BACKFILL.get('min_span_days', 2))
+# Au-delà de 90 jours, market_chart/range répond en granularité journalière
+DAILY_MIN_SPAN = pd.Timedelta(days=91)
+DAILY_MAX_SPAN = pd.Timedelta(days=BACKFILL.get('daily_max_span_days', 365))
+BACKFILL_WORKERS = BACKFILL.get('max_workers', MAX_WORKERS)
+MAX_ATTEMPTS = BACKFILL.get('max_attempts', 3)
+
+def init_coverage_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_coverage (
+            crypto TEXT PRIMARY KEY,
+            scanned_until TEXT,
+            updated_at TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_gaps (
+            crypto TEXT,
+            gap_start TEXT,
+            gap_end TEXT,
+            attempts INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'open',
+            last_error TEXT,
+            PRIMARY KEY (crypto, gap_start)
+        )
+    ''')
+    conn.commit()
+
+def _epoch(timestamp):
+    """Timestamp naïf en heure locale -> epoch (s), comme datetime.timestamp()"""
+    return pd.Timestamp(timestamp).to_pydatetime().timestamp()
+
+def scan_gaps(conn, crypto, since=None, now=None):
+    """Trous de `crypto` après `since` ; renvoie ([(début, fin), ...], dernier timestamp)
+
+    Début et fin sont les prix qui encadrent le trou.
+    """
+    now = pd.Timestamp(now or datetime.datetime.now())
+    query = 'SELECT timestamp FROM prices WHERE crypto = ?'
+    params = [crypto]
+    if since is not None:
+        # Borne au jour près (séparateurs mélangés), filtrage exact après conversion
+        query += ' AND timestamp >= ?'
+        params.append(pd.Timestamp(since).strftime('%Y-%m-%d'))
+    with metrics.timed('backfill.scan') as t:
+        timestamps = pd.to_datetime(pd.read_sql_query(query, conn, params=params)['timestamp'], format='ISO8601')
+        timestamps = np.sort(timestamps.to_numpy(dtype='datetime64[us]'))
+        if since is not None:
+            timestamps = timestamps[timestamps >= np.datetime64(pd.Timestamp(since), 'us')]
+        t.rows = len(timestamps)
+    if len(timestamps) == 0:
+        return [], None
+
+    # Pas attendu selon l'ancienneté du prix qui ouvre l'intervalle : horaire,
+    # puis journalier après compaction (le dernier prix journalier peut précéder
+    # d'un jour le premier prix horaire)
+    old = (np.datetime64(now, 'us') - timestamps[:-1]) > np.timedelta64(HOURLY_DAYS * 86400, 's')
+    limits = np.where(old, 86400, INTERVAL) * TOLERANCE
+    holes = np.diff(timestamps) > limits.astype('timedelta64[s]')
+    gaps = [(pd.Timestamp(start), pd.Timestamp(end))
+            for start, end in zip(timestamps[:-1][holes], timestamps[1:][holes])]
+    return gaps, pd.Timestamp(timestamps[-1])
+
+def plan_requests(gaps, max_span=MAX_SPAN, min_span=MIN_SPAN):
+    """Regroupe des trous triés en un minimum de plages d'au plus `max_span`
+
+    Regroupement glouton de gauche à droite (optimal pour couvrir des
+    intervalles triés avec des plages de longueur bornée) ; un trou plus
+    long que `max_span` est découpé. Les plages trop courtes sont élargies
+    vers le passé jusqu'à `min_span` pour garder la granularité horaire.
+    Renvoie [(début, fin, trous couverts)].
+    """
+    pieces = []
+    for start, end in gaps:
+        while end - start > max_span:
+            pieces.append((start, start + max_span))
+            start += max_span
+        pieces.append((start, end))
+
+    requests = []
+    for start, end in pieces:
+        if requests and end - requests[-1][0] <= max_span:
+            requests[-1][1] = end
+            requests[-1][2].append((start, end))
+        else:
+            requests.append([start, end, [(start, end)]])
+    return [(min(start, end - min_span), end, covered) for start, end, covered in requests]
+
+def split_gaps(gaps, boundary):
+    """Sépare des trous triés en (palier journalier, palier horaire) autour de `boundary`"""
+    daily, hourly = [], []
+    for start, end in gaps:
+        if end <= boundary:
+            daily.append((start, end))
+        elif start >= boundary:
+            hourly.append((start, end))
+        else:
+            daily.append((start, boundary))
+            hourly.append((boundary, end))
+    return daily, hourly
+
+def _inside_gaps(timestamps_ms, gaps):
+    """Masque des points situés strictement à l'intérieur d'un des trous (triés, disjoints)"""
+    starts = np.array([_epoch(start) * 1000 for start, _ in gaps])
+    ends = np.array([_epoch(end) * 1000 for _, end in gaps])
+    position = np.searchsorted(starts, timestamps_ms, side='right') - 1
+    valid = position >= 0
+    position = np.clip(position, 0, None)
+    return valid & (timestamps_ms > starts[position]) & (timestamps_ms < ends[position])
+
+def _run_requests(requests, max_workers):
+    """Exécute les requêtes en parallèle et stocke les points des trous ; renvoie (stockés, erreurs par crypto)"""
+    stored, errors = 0, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_range_arrays, crypto, _epoch(start), _epoch(end)): (crypto, gaps)
+            for crypto, start, end, gaps in requests
+        }
+        # Les écritures SQLite restent dans ce thread, au fil des réponses
+        for future in as_completed(futures):
+            crypto, gaps = futures[future]
+            try:
+                timestamps, prices = future.result()
+            except Exception as e:
+                print(f"❌ Rattrapage de {crypto} échoué : {e}")
+                errors[crypto] = str(e)
+                metrics.incr('backfill_errors', crypto=crypto)
+                continue
+            inside = _inside_gaps(timestamps, gaps)
+            if inside.any():
+                stored += store_price_arrays(crypto, timestamps[inside], prices[inside])
+    return stored, errors
+
+def _update_coverage(conn, crypto, since, now, attempted, error=None):
+    """Rescanne après rattrapage, met à jour les trous ouverts et avance le filigrane"""
+    known = {gap_start: (attempts, status) for gap_start, attempts, status in conn.execute(
+        'SELECT gap_start, attempts, status FROM price_gaps WHERE crypto = ?', (crypto,))}
+    gaps, last = scan_gaps(conn, crypto, since, now)
+    conn.execute("DELETE FROM price_gaps WHERE crypto = ? AND status = 'open'", (crypto,))
+    watermark = last
+    still_open = 0
+    for start, end in gaps:
+        key = start.isoformat()
+        attempts, status = known.get(key, (0, 'open'))
+        if status == 'abandoned':
+            continue
+        if key in attempted:
+            attempts += 1
+        status = 'abandoned' if attempts >= MAX_ATTEMPTS else 'open'
+        conn.execute('INSERT OR REPLACE INTO price_gaps VALUES (?, ?, ?, ?, ?, ?)',
+                     (crypto, key, end.isoformat(), attempts, status, error))
+        if status == 'open':
+            still_open += 1
+            watermark = min(watermark, start)
+    if watermark is not None:
+        conn.execute('INSERT OR REPLACE INTO price_coverage VALUES (?, ?, ?)',
+                     (crypto, watermark.isoformat(), datetime.datetime.now().isoformat()))
+    return still_open
+
+def backfill(cryptos=None, now=None, dry_run=False, rescan=False, max_workers=BACKFILL_WORKERS):
+    """Détecte et comble les trous de toutes les cryptos ; renvoie un résumé"""
+    cryptos = list(cryptos or CRYPTOS)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    init_coverage_tables(conn)
+    coverage = dict(conn.execute('SELECT crypto, scanned_until FROM price_coverage'))
+    abandoned = set(conn.execute("SELECT crypto, gap_start FROM price_gaps WHERE status = 'abandoned'"))
+
+    # Début du palier horaire : les trous plus anciens sont demandés en journalier
+    boundary = pd.Timestamp(now or datetime.datetime.now()) - pd.Timedelta(days=HOURLY_DAYS)
+    scans, requests = {}, []
+    gap_count = 0
+    for crypto in cryptos:
+        since = None if rescan else coverage.get(crypto)
+        try:
+            gaps, last = scan_gaps(conn, crypto, since, now)
+        except pd.errors.DatabaseError:
+            # Table prices pas encore créée
+            break
+        gaps = [gap for gap in gaps if (crypto, gap[0].isoformat()) not in abandoned]
+        scans[crypto] = (since, gaps)
+        gap_count += len(gaps)
+        daily, hourly = split_gaps(gaps, boundary)
+        requests.extend((crypto, *request) for request in plan_requests(daily, DAILY_MAX_SPAN, DAILY_MIN_SPAN))
+        requests.extend((crypto, *request) for request in plan_requests(hourly))
+
+    print(f"🔎 {gap_count} trou(s) sur {len(scans)} cryptos -> {len(requests)} requête(s) market_chart/range")
+    if dry_run:
+        for crypto, start, end, gaps in requests:
+            print(f"   {crypto} : {start} -> {end} ({len(gaps)} trou(s))")
+        conn.close()
+        return {'gaps': gap_count, 'requests': len(requests), 'stored': 0, 'open': gap_count}
+
+    stored, errors = _run_requests(requests, max_workers) if requests else (0, {})
+
+    still_open = 0
+    for crypto, (since, gaps) in scans.items():
+        attempted = {start.isoformat() for start, _ in gaps}
+        still_open += _update_coverage(conn, crypto, since, now, attempted, errors.get(crypto))
+    conn.commit()
+    conn.close()
+
+    if stored:
+        print(f"✅ {stored} prix rattrapés")
+        publish_snapshot()
+    if still_open:
+        print(f"⚠️ {still_open} trou(s) encore ouvert(s)")
+    return {'gaps': gap_count, 'requests': len(requests), 'stored': stored, 'open': still_open}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='affiche le plan sans rien récupérer')
+    parser.add_argument('--rescan', action='store_true', help='ignore les filigranes et rescanne tout')
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS)
+    parser.add_argument('--now', help='date de référence ISO (par défaut maintenant)')
+    args = parser.parse_args()
+    now = datetime.datetime.fromisoformat(args.now) if args.now else None
+    backfill(now=now, dry_run=args.dry_run, rescan=args.rescan, max_workers=args.workers)
+
+if __name__ == '__main__':
+    main()
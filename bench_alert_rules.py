@@ -0,0 +1,99 @@
+"""Benchmark de l'index de règles d'alerte (alert_rules.RuleStore)
+
+Charge 100 000 règles sur plusieurs cryptos, puis rejoue un flux de ticks
+(1 000 ticks/s simulés) et compare la recherche indexée au parcours
+linéaire de toutes les règles.
+
+    python bench_alert_rules.py [--rules 100000] [--ticks 10000] [--assets 50]
+"""
+import argparse
+import random
+import time
+from alert_rules import RuleStore
+
+def make_rules(n_rules, base_prices, rng):
+    rules = []
+    cryptos = list(base_prices)
+    for i in range(n_rules):
+        crypto = rng.choice(cryptos)
+        rules.append({
+            'crypto': crypto,
+            'direction': rng.choice(('below', 'above')),
+            'threshold': base_prices[crypto] * rng.uniform(0.8, 1.2),
+            'email': f'user{i % 5000}@example.com',
+        })
+    return rules
+
+def make_ticks(n_ticks, base_prices, rng):
+    """Marche aléatoire : un tick = (crypto, nouveau prix)"""
+    prices = dict(base_prices)
+    cryptos = list(base_prices)
+    ticks = []
+    for _ in range(n_ticks):
+        crypto = rng.choice(cryptos)
+        prices[crypto] *= 1 + rng.gauss(0, 0.002)
+        ticks.append((crypto, prices[crypto]))
+    return ticks
+
+def linear_match(rules, crypto, p0, p1):
+    matched = []
+    for rule in rules:
+        if rule['crypto'] != crypto:
+            continue
+        if rule['direction'] == 'below' and p1 < rule['threshold'] <= p0:
+            matched.append(rule)
+        elif rule['direction'] == 'above' and p0 <= rule['threshold'] < p1:
+            matched.append(rule)
+    return matched
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=100_000)
+    parser.add_argument('--ticks', type=int, default=10_000)
+    parser.add_argument('--assets', type=int, default=50)
+    parser.add_argument('--linear-ticks', type=int, default=200, help='ticks rejoués en parcours linéaire')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    base_prices = {f'asset{i:03d}': rng.uniform(0.1, 100_000) for i in range(args.assets)}
+    rules = make_rules(args.rules, base_prices, rng)
+    ticks = make_ticks(args.ticks, base_prices, rng)
+
+    start = time.perf_counter()
+    store = RuleStore(rules)
+    store.match(ticks[0][0], None, ticks[0][1])
+    build = time.perf_counter() - start
+    print(f"Index : {len(store)} règles chargées en {build * 1000:.1f} ms")
+
+    last = dict(base_prices)
+    latencies = []
+    matched = 0
+    start = time.perf_counter()
+    for crypto, price in ticks:
+        t0 = time.perf_counter()
+        matched += len(store.match(crypto, last[crypto], price))
+        latencies.append(time.perf_counter() - t0)
+        last[crypto] = price
+    elapsed = time.perf_counter() - start
+    print(f"Indexé : {len(ticks)} ticks en {elapsed:.3f} s -> {len(ticks) / elapsed:,.0f} ticks/s, "
+          f"{matched} déclenchements, p50 {percentile(latencies, 0.5) * 1e6:.1f} µs, "
+          f"p99 {percentile(latencies, 0.99) * 1e6:.1f} µs")
+    print(f"Budget à 1 000 ticks/s : {elapsed / len(ticks) * 1000 * 100:.2f} % d'un cœur")
+
+    last = dict(base_prices)
+    sample = ticks[:args.linear_ticks]
+    start = time.perf_counter()
+    for crypto, price in sample:
+        linear_match(rules, crypto, last[crypto], price)
+        last[crypto] = price
+    linear = (time.perf_counter() - start) / len(sample)
+    print(f"Linéaire : {1 / linear:,.0f} ticks/s ({linear * 1000:.2f} ms/tick) "
+          f"-> facteur {linear / (elapsed / len(ticks)):,.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Simulateur local de l'API CoinGecko (market_chart et simple/price)
+
+Sert des réponses synthétiques (marche aléatoire déterministe par crypto)
+ou rejoue des réponses enregistrées, avec latence, taux d'erreur et
+limitation de débit (réponses 429) configurables.
+
+    python coingecko_simulator.py --port 8765 --assets 500 --latency 50 --rate-limit 30
+    COINGECKO_API_URL=http://localhost:8765/api/v3 python data_collector.py
+
+Enregistrement depuis la vraie API puis rejeu hors ligne :
+
+    python coingecko_simulator.py --record recordings/
+    python coingecko_simulator.py --replay recordings/
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+UPSTREAM_URL = 'https://api.coingecko.com'
+
+# Taux fictifs pour 1 EUR
+FX = {'eur': 1.0, 'usd': 1.08, 'gbp': 0.85, 'chf': 0.95, 'jpy': 165.0}
+
+def simulated_ids(n_assets):
+    """Univers synthétique : sim-coin-0000, sim-coin-0001, ..."""
+    return [f'sim-coin-{i:04d}' for i in range(n_assets)]
+
+class CoinGeckoSimulator:
+    """Serveur HTTP simulant CoinGecko, démarré dans un thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, n_assets=100, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit=0.0, interval=300, record_dir=None, replay_dir=None,
+                 seed=0):
+        self.n_assets = n_assets
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.interval = interval
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.seed = seed
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'points': 0}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._bucket_tokens = rate_limit
+        self._bucket_time = time.monotonic()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/api/v3'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='coingecko-sim', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Données synthétiques -------------------------------------------
+
+    def _asset_params(self, crypto):
+        digest = hashlib.sha256(f'{self.seed}:{crypto}'.encode()).digest()
+        base_price = 10 ** (int.from_bytes(digest[:2], 'big') / 65535 * 6 - 1)
+        volatility = 0.002 + digest[2] / 255 * 0.01
+        return base_price, volatility, int.from_bytes(digest[3:7], 'big')
+
+    def price_at(self, crypto, timestamp):
+        """Prix déterministe d'une crypto à un instant (pas de `interval` secondes)"""
+        base_price, volatility, phase = self._asset_params(crypto)
+        step = int(timestamp // self.interval)
+        # Marche pseudo-aléatoire reproductible : somme de sinus de fréquences incommensurables
+        walk = (math.sin(step * 0.0131 + phase) * 3 + math.sin(step * 0.0977 + phase * 0.5)
+                + math.sin(step * 0.731 + phase * 0.25) * 0.3)
+        return base_price * math.exp(walk * volatility * 10)
+
+    def market_chart(self, crypto, currency, days, start=None, end=None):
+        """Série de prix avec la granularité de CoinGecko (fine <= 1 j, horaire <= 90 j, sinon journalière)"""
+        now = time.time()
+        if start is None:
+            end = now
+            start = now - (365 * 20 if days == 'max' else float(days)) * 86400
+        span = end - start
+        step = self.interval if span <= 86400 else max(self.interval, 3600 if span <= 90 * 86400 else 86400)
+        rate = FX.get(currency, 1.0)
+        prices = [
+            [t * 1000, self.price_at(crypto, t) * rate]
+            for t in range(int(math.ceil(start / step)) * step, int(min(end, now)) + 1, step)
+        ]
+        with self._lock:
+            self.stats['points'] += len(prices)
+        return {'prices': prices, 'market_caps': [], 'total_volumes': []}
+
+    def simple_price(self, ids, currencies, include_change):
+        now = time.time()
+        result = {}
+        for crypto in ids:
+            price = self.price_at(crypto, now)
+            previous = self.price_at(crypto, now - 86400)
+            quotes = {}
+            for currency in currencies:
+                quotes[currency] = price * FX.get(currency, 1.0)
+                if include_change:
+                    quotes[f'{currency}_24h_change'] = (price - previous) / previous * 100
+            result[crypto] = quotes
+        return result
+
+    # --- Comportement réseau -----------------------------------------------
+
+    def _rate_limited(self):
+        """Seau à jetons : plus de `rate_limit` requêtes/s -> 429"""
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._bucket_tokens = min(self.rate_limit,
+                                      self._bucket_tokens + (now - self._bucket_time) * self.rate_limit)
+            self._bucket_time = now
+            if self._bucket_tokens < 1:
+                return True
+            self._bucket_tokens -= 1
+            return False
+
+    def _should_fail(self):
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._rng.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, self.latency + extra))
+
+    # --- Enregistrement / rejeu ------------------------------------------
+
+    def _recording_path(self, directory, path_and_query):
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', path_and_query.strip('/'))
+        if len(name) > 150:
+            name = name[:100] + '_' + hashlib.sha1(name.encode()).hexdigest()
+        return os.path.join(directory, name + '.json')
+
+    def respond(self, path_and_query):
+        """Renvoie (status, corps JSON, en-têtes) pour une requête"""
+        with self._lock:
+            self.stats['requests'] += 1
+        self._delay()
+        if self._rate_limited():
+            with self._lock:
+                self.stats['rate_limited'] += 1
+            return 429, {'status': {'error_code': 429, 'error_message': 'rate limited'}}, {'Retry-After': '1'}
+        if self._should_fail():
+            with self._lock:
+                self.stats['errors'] += 1
+            return 500, {'error': 'simulated failure'}, {}
+
+        if self.replay_dir:
+            path = self._recording_path(self.replay_dir, path_and_query)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    return 200, json.load(f), {}
+
+        if self.record_dir:
+            with urllib.request.urlopen(UPSTREAM_URL + path_and_query, timeout=60) as upstream:
+                body = json.load(upstream)
+            os.makedirs(self.record_dir, exist_ok=True)
+            with open(self._recording_path(self.record_dir, path_and_query), 'w', encoding='utf-8') as f:
+                json.dump(body, f)
+            return 200, body, {}
+
+        parts = urlsplit(path_and_query)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        match = re.fullmatch(r'/api/v3/coins/([^/]+)/market_chart(/range)?', parts.path)
+        if match:
+            currency = query.get('vs_currency', 'eur')
+            if match.group(2):
+                return 200, self.market_chart(match.group(1), currency, None,
+                                              float(query['from']), float(query['to'])), {}
+            return 200, self.market_chart(match.group(1), currency, query.get('days', '1')), {}
+        if parts.path == '/api/v3/simple/price':
+            ids = [i for i in query.get('ids', '').split(',') if i]
+            currencies = [c for c in query.get('vs_currencies', 'eur').split(',') if c]
+            return 200, self.simple_price(ids, currencies, query.get('include_24hr_change') == 'true'), {}
+        if parts.path == '/api/v3/coins/list':
+            return 200, [{'id': crypto, 'symbol': crypto[-4:], 'name': crypto.replace('-', ' ').title()}
+                         for crypto in simulated_ids(self.n_assets)], {}
+        if parts.path == '/api/v3/ping':
+            return 200, {'gecko_says': '(V3) To the Moon!'}, {}
+        return 404, {'error': 'not found'}, {}
+
+    def _make_handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body, headers = simulator.respond(self.path)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--assets', type=int, default=100, help="nombre de cryptos synthétiques annoncées")
+    parser.add_argument('--latency', type=float, default=0.0, help='latence ajoutée par requête (ms)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='variation aléatoire de la latence (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help="part des requêtes en erreur 500 (0-1)")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='requêtes/s avant réponses 429 (0 = illimité)')
+    parser.add_argument('--interval', type=int, default=300, help='pas des séries synthétiques (secondes)')
+    parser.add_argument('--record', metavar='DIR', help="relaie vers la vraie API et enregistre les réponses")
+    parser.add_argument('--replay', metavar='DIR', help='rejoue les réponses enregistrées (synthétique sinon)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    simulator = CoinGeckoSimulator(
+        args.host, args.port, n_assets=args.assets, latency=args.latency / 1000, jitter=args.jitter / 1000,
+        error_rate=args.error_rate, rate_limit=args.rate_limit, interval=args.interval,
+        record_dir=args.record, replay_dir=args.replay, seed=args.seed
+    )
+    print(f"🧪 Simulateur CoinGecko sur {simulator.base_url} ({args.assets} cryptos)")
+    print(f"   ids : {', '.join(simulated_ids(min(args.assets, 3)))}...")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import yaml
+
+CONFIG_PATH = os.environ.get('CRYPTO_CONFIG', 'config.yaml')
+# Base SQLite (surchargeable pour les benchmarks et la génération de charge)
+DB_PATH = os.environ.get('CRYPTO_DB_PATH', 'crypto_data.db')
+
+_config = None
+
+def load_config(path=None, reload=False):
+    """Charge config.yaml (mis en cache après la première lecture)"""
+    global _config
+    if _config is None or reload or path is not None:
+        with open(path or CONFIG_PATH, encoding='utf-8') as f:
+            loaded = yaml.safe_load(f) or {}
+        if path is not None:
+            return loaded
+        _config = loaded
+    return _config
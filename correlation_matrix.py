@@ -0,0 +1,173 @@
+"""Covariance / corrélation glissantes entre cryptos et volatilité par crypto
+
+Les rendements logarithmiques de toutes les cryptos sont alignés sur des
+barres communes (1 h par défaut, section `correlation` de config.yaml).
+Sur une fenêtre de `window` barres, le moteur garde un tampon circulaire
+des rendements et les sommes courantes nécessaires aux statistiques par
+paire (X : rendements, 0 si absents ; M : masque de présence) :
+
+    C = MᵀM     barres où i et j ont tous deux un rendement
+    A = XᵀM     somme des rendements de i sur ces barres
+    Q = (X²)ᵀM  somme de leurs carrés
+    P = XᵀX     somme des produits croisés
+
+L'arrivée de k barres ajoute leurs contributions et retire celles des k
+barres sorties de la fenêtre : quelques produits matriciels (k×N)ᵀ(k×N),
+au lieu de recalculer les N² corrélations sur toute la fenêtre.
+"""
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+import metrics
+from config import load_config
+from technical_indicators import get_price_window
+
+CORRELATION = load_config().get('correlation', {})
+BAR = CORRELATION.get('bar', '1h')
+WINDOW = CORRELATION.get('window', 168)
+# Barres communes minimum pour publier une corrélation
+MIN_PERIODS = CORRELATION.get('min_periods', 24)
+
+class RollingCorrelation:
+    """Statistiques glissantes sur les `window` dernières barres clôturées"""
+
+    def __init__(self, assets, window=WINDOW, bar=BAR):
+        self.assets = list(assets)
+        self.window = window
+        self.bar = bar
+        # Marchés ouverts en continu : volatilité annualisée sur 365 jours
+        self.bars_per_year = 365 * 86400 / pd.Timedelta(bar).total_seconds()
+        n = len(self.assets)
+        self.last_bar = None
+        self.count = 0
+        self._pos = 0
+        self._since_recompute = 0
+        self._last_prices = np.full(n, np.nan)
+        self._returns = np.zeros((window, n))
+        self._present = np.zeros((window, n))
+        self._C, self._A, self._Q, self._P = (np.zeros((n, n)) for _ in range(4))
+
+    def _accumulate(self, x, m, sign=1.0):
+        self._C += sign * (m.T @ m)
+        self._A += sign * (x.T @ m)
+        self._Q += sign * ((x * x).T @ m)
+        self._P += sign * (x.T @ x)
+
+    def _recompute(self):
+        """Recalcule les sommes depuis le tampon (évite la dérive des soustractions)"""
+        for total in (self._C, self._A, self._Q, self._P):
+            total.fill(0.0)
+        self._accumulate(self._returns, self._present)
+        self._since_recompute = 0
+
+    def update(self, prices):
+        """Ajoute des barres clôturées ; renvoie le nombre de barres intégrées
+
+        `prices` : prix de clôture, index de timestamps croissants, une
+        colonne par crypto (NaN si aucune cotation dans la barre). Les
+        barres déjà intégrées sont ignorées.
+        """
+        prices = prices.reindex(columns=self.assets)
+        if self.last_bar is not None:
+            prices = prices[prices.index > self.last_bar]
+        if prices.empty:
+            return 0
+
+        # Rendement de chaque barre par rapport au dernier prix connu de la crypto
+        values = prices.to_numpy(dtype=float)
+        filled = pd.DataFrame(np.vstack([self._last_prices, values])).ffill().to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.log(values / filled[:-1])
+        self._last_prices = filled[-1]
+        self.last_bar = prices.index[-1]
+
+        # Seules les `window` dernières barres restent dans la fenêtre
+        returns = returns[-self.window:]
+        present = np.isfinite(returns)
+        x = np.where(present, returns, 0.0)
+        m = present.astype(float)
+        slots = (self._pos + np.arange(len(x))) % self.window
+        # Les cases encore vides valent 0 : les retirer est sans effet
+        self._accumulate(self._returns[slots], self._present[slots], -1.0)
+        self._accumulate(x, m)
+        self._returns[slots] = x
+        self._present[slots] = m
+        self._pos = (self._pos + len(x)) % self.window
+        self.count = min(self.window, self.count + len(x))
+
+        self._since_recompute += len(x)
+        if self._since_recompute >= self.window:
+            self._recompute()
+        return len(prices)
+
+    def _frame(self, values, min_periods):
+        values[self._C < min_periods] = np.nan
+        return pd.DataFrame(values, index=self.assets, columns=self.assets)
+
+    def covariance(self, min_periods=MIN_PERIODS):
+        """Matrice de covariance des rendements (par paire de barres communes)"""
+        C, A = self._C, self._A
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self._P - A * A.T / C) / (C - 1)
+        return self._frame(cov, min_periods)
+
+    def correlation(self, min_periods=MIN_PERIODS):
+        """Matrice de corrélation de Pearson des rendements"""
+        C, A, Q = self._C, self._A, self._Q
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = (C * self._P - A * A.T) / np.sqrt((C * Q - A ** 2) * (C * Q.T - A.T ** 2))
+        return self._frame(np.clip(corr, -1.0, 1.0), min_periods)
+
+    def volatility(self, min_periods=MIN_PERIODS):
+        """Volatilité annualisée (%) de chaque crypto sur la fenêtre"""
+        c, a, q = np.diag(self._C), np.diag(self._A), np.diag(self._Q)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.maximum((q - a * a / c) / (c - 1), 0.0)
+        volatility = np.sqrt(variance * self.bars_per_year) * 100
+        volatility[c < min_periods] = np.nan
+        return pd.Series(volatility, index=self.assets)
+
+def load_bars(assets, start, end, bar=BAR):
+    """Prix de clôture alignés par barre entre start et end (une colonne par crypto)"""
+    resolution = (bar, bar, int(pd.Timedelta(bar).total_seconds()))
+    columns = {}
+    for crypto in assets:
+        df = get_price_window(crypto, start, end, resolution)
+        if not df.empty:
+            columns[crypto] = df.set_index('timestamp')['price']
+    if not columns:
+        # Aucune cotation dans la fenêtre (installation neuve, collecteur arrêté)
+        return pd.DataFrame(columns=list(assets), index=pd.DatetimeIndex([], name='timestamp'), dtype=float)
+    return pd.DataFrame(columns).reindex(columns=list(assets)).sort_index()
+
+_lock = threading.Lock()
+_engines = {}
+
+def get_rolling_correlation(assets, window=WINDOW, bar=BAR, now=None):
+    """Moteur à jour pour `assets`
+
+    Le premier appel charge toute la fenêtre ; les suivants ne lisent que
+    les barres clôturées depuis, via le même chemin de données que le
+    graphique (instantané partagé puis SQLite). Les prix sont en devise de
+    base : les corrélations ne dépendent pas de la devise d'affichage.
+    """
+    step = pd.Timedelta(bar)
+    closed_until = pd.Timestamp(now or datetime.datetime.now()).floor(bar)
+    key = (tuple(assets), window, bar)
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = RollingCorrelation(assets, window, bar)
+        # Une barre de plus que la fenêtre : le premier rendement a besoin du prix précédent
+        start = closed_until - step * (window + 1)
+        if engine.last_bar is not None:
+            start = max(start, engine.last_bar + step)
+        if start < closed_until:
+            with metrics.timed('correlation.load_bars') as t:
+                bars = load_bars(assets, start, closed_until - pd.Timedelta(microseconds=1), bar)
+                t.rows = len(bars)
+            if not bars.empty:
+                with metrics.timed('correlation.update') as t:
+                    t.rows = engine.update(bars[bars.index < closed_until])
+        return engine
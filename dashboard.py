@@ -3,8 +3,15 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import pandas as pd
-from data_collector import CRYPTOS, fetch_all_current_prices, update_all_cryptos
-from technical_indicators import get_all_indicators, generate_signals
+import time
+import metrics
+from data_collector import CRYPTOS, CURRENCIES, fetch_all_current_prices, update_all_cryptos
+from technical_indicators import (
+    BASE_CURRENCY, generate_signals, get_price_bounds, get_recent_indicators, get_window_indicators, has_fx_rates
+)
+from price_snapshot import snapshot_version
+from correlation_matrix import BAR, get_rolling_correlation
+from market_summary import SORTABLE_COLUMNS, SIGNAL_TYPES, count_summary_rows, get_summary_page
 
 # Configuration de la page
 st.set_page_config(
@@ -60,6 +67,20 @@ selected_crypto = st.sidebar.selectbox(
     index=0
 )
 
+# Devise d'affichage (prix stockés en devise de base, convertis à la lecture)
+CURRENCY_SYMBOLS = {'eur': '€', 'usd': '$', 'gbp': '£', 'chf': 'CHF', 'jpy': '¥'}
+selected_currency = st.sidebar.selectbox(
+    "Devise:",
+    options=CURRENCIES,
+    format_func=str.upper,
+    index=CURRENCIES.index(BASE_CURRENCY)
+)
+if not has_fx_rates(selected_currency):
+    st.sidebar.warning(f"Pas encore de taux {selected_currency.upper()} - affichage en {BASE_CURRENCY.upper()}")
+    selected_currency = BASE_CURRENCY
+currency_symbol = CURRENCY_SYMBOLS.get(selected_currency, selected_currency.upper())
+currency_label = selected_currency.upper()
+
 # Bouton de mise à jour
 if st.sidebar.button("🔄 Mettre à jour les données", type="primary"):
     with st.spinner("Mise à jour en cours..."):
@@ -74,21 +95,91 @@ show_indicators = st.sidebar.multiselect(
     default=["RSI", "MACD", "Bollinger Bands"]
 )
 
-# Récupération des données optimisée
+# Période du graphique principal (relative à la dernière donnée disponible)
+CHART_PERIODS = {
+    "6 heures": pd.Timedelta(hours=6),
+    "24 heures": pd.Timedelta(hours=24),
+    "7 jours": pd.Timedelta(days=7),
+    "30 jours": pd.Timedelta(days=30),
+    "90 jours": pd.Timedelta(days=90),
+    "1 an": pd.Timedelta(days=365),
+    "Tout": None
+}
+selected_period = st.sidebar.selectbox("📅 Période du graphique:", list(CHART_PERIODS.keys()), index=3)
+
+# Mode debug : chronométrage des étapes (désactivé par défaut). Le réglage est
+# global au processus, partagé par toutes les sessions : une session ne fait que
+# l'activer, jamais le couper pour les autres (défaut : CRYPTO_METRICS)
+debug_metrics = st.sidebar.checkbox("🐞 Debug performance", value=metrics.DEFAULT_ENABLED)
+if debug_metrics:
+    metrics.enable()
+
+# Récupération des données optimisée ; `version` (instantané partagé publié
+# par le collecteur) fait partie de la clé de cache : chaque publication l'invalide.
+# Métriques et signaux portent sur les 30 derniers jours, pas sur tout l'historique
 @st.cache_data(ttl=300)
-def load_crypto_data(crypto):
-    df, indicators = get_all_indicators(crypto)
-    signals = generate_signals(df, indicators) if df is not None and not df.empty else []
+def load_crypto_data(crypto, currency, version):
+    metrics.incr('cache_misses', cache='load_crypto_data')
+    result = get_recent_indicators(crypto, currency)
+    if result is None:
+        return None, {}, []
+    df, indicators = result
+    signals = generate_signals(df, indicators) if len(df) > 1 else []
     return df, indicators, signals
 
 @st.cache_data(ttl=60)
-def load_all_current_prices():
-    return fetch_all_current_prices()
+def load_all_current_prices(currency):
+    metrics.incr('cache_misses', cache='load_all_current_prices')
+    return fetch_all_current_prices(currency)
+
+@st.cache_data(ttl=300)
+def load_price_bounds(crypto, version):
+    return get_price_bounds(crypto)
+
+@st.cache_data(ttl=300)
+def load_chart_window(crypto, start, end, currency, version):
+    metrics.incr('cache_misses', cache='load_chart_window')
+    return get_window_indicators(crypto, start, end, currency=currency)
+
+@st.cache_data(ttl=300)
+def load_correlation(cryptos, version):
+    metrics.incr('cache_misses', cache='load_correlation')
+    # Moteur incrémental gardé en mémoire : seules les nouvelles barres sont lues
+    engine = get_rolling_correlation(cryptos)
+    return engine.correlation(), engine.volatility(), engine.count
+
+@st.cache_data(ttl=60)
+def load_summary_count(search, signal_type):
+    return count_summary_rows(search, signal_type)
 
-df, indicators, signals = load_crypto_data(selected_crypto)
-all_current_prices = load_all_current_prices()
+@st.cache_data(ttl=60)
+def load_summary_page(page, page_size, sort_by, ascending, search, signal_type, currency):
+    return get_summary_page(page, page_size, sort_by, ascending, search, signal_type, currency)
+
+# Les misses sont comptés dans les fonctions en cache, les requêtes ici
+data_version = snapshot_version()
+metrics.incr('cache_requests', cache='load_crypto_data')
+df, indicators, signals = load_crypto_data(selected_crypto, selected_currency, data_version)
+metrics.incr('cache_requests', cache='load_all_current_prices')
+all_current_prices = load_all_current_prices(selected_currency)
 current_data = all_current_prices.get(selected_crypto, {'price': 0, 'change_24h': 0})
 
+# Fenêtre visible du graphique : période choisie, ou zoom sélectionné sur le graphique
+first_timestamp, last_timestamp = load_price_bounds(selected_crypto, data_version)
+chart_zoom_key = (selected_crypto, selected_period)
+chart_window = None
+if last_timestamp is not None:
+    zoom = st.session_state.get('chart_zoom')
+    if zoom and zoom['key'] == chart_zoom_key:
+        chart_window = zoom['range']
+    else:
+        period = CHART_PERIODS[selected_period]
+        window_start = first_timestamp if period is None else max(first_timestamp, last_timestamp - period)
+        chart_window = (window_start.floor('min'), last_timestamp.ceil('min'))
+    if zoom and zoom['key'] == chart_zoom_key and st.sidebar.button("↩️ Réinitialiser le zoom"):
+        del st.session_state['chart_zoom']
+        st.rerun()
+
 # Affichage des métriques principales avec design amélioré
 if current_data and df is not None and not df.empty:
     col1, col2, col3, col4 = st.columns(4)
@@ -97,16 +188,16 @@ if current_data and df is not None and not df.empty:
         change_color = "normal" if current_data['change_24h'] >= 0 else "inverse"
         st.metric(
             f"💰 Prix {CRYPTOS[selected_crypto]}", 
-            f"{current_data['price']:,.2f} €",
+            f"{current_data['price']:,.2f} {currency_symbol}",
             f"{current_data['change_24h']:+.2f}%",
             delta_color=change_color
         )
     
     with col2:
-        st.metric("📈 Prix Max (30j)", f"{df['price'].max():,.2f} €")
+        st.metric("📈 Prix Max (30j)", f"{df['price'].max():,.2f} {currency_symbol}")
     
     with col3:
-        st.metric("📉 Prix Min (30j)", f"{df['price'].min():,.2f} €")
+        st.metric("📉 Prix Min (30j)", f"{df['price'].min():,.2f} {currency_symbol}")
     
     with col4:
         if 'rsi' in indicators:
@@ -147,11 +238,22 @@ if current_data and df is not None and not df.empty:
         'stoch_d': '#D35400'         # Orange foncé
     }
     
+    # Données du graphique : uniquement la fenêtre visible, à la résolution adaptée
+    metrics.incr('cache_requests', cache='load_chart_window')
+    chart_data = load_chart_window(selected_crypto, *chart_window, selected_currency, data_version) if chart_window else None
+    if chart_data is None:
+        chart_df, chart_indicators, chart_resolution = df, indicators, "brut"
+    else:
+        chart_df, chart_indicators, chart_resolution = chart_data
+    if chart_df['price'].isna().any():
+        st.warning(f"⚠️ Pas de taux {currency_label} pour les prix les plus anciens : ils ne sont pas affichés")
+    
     # Créer le graphique principal avec sous-graphiques
+    figure_start = time.perf_counter()
     selected_indicators = [x for x in show_indicators if x in ["RSI", "MACD", "Stochastique"]]
     rows = 1 + len(selected_indicators)
     
-    subplot_titles = [f"💰 Prix {CRYPTOS[selected_crypto]} (EUR)"]
+    subplot_titles = [f"💰 Prix {CRYPTOS[selected_crypto]} ({currency_label})"]
     for indicator in selected_indicators:
         if indicator == "RSI":
             subplot_titles.append("📊 RSI (Relative Strength Index)")
@@ -176,33 +278,48 @@ if current_data and df is not None and not df.empty:
     
     current_row = 1
     
-    # Graphique des prix principal avec design amélioré
-    fig.add_trace(
-        go.Scatter(
-            x=df['timestamp'], 
-            y=df['price'],
-            mode='lines',
-            name=f'Prix {selected_crypto.upper()}',
-            line=dict(color=colors['price'], width=3),
-            hovertemplate='<b>💰 Prix</b>: %{y:,.2f} €<br>' +
-                         '<b>📅 Date</b>: %{x}<br>' +
-                         '<extra></extra>'
-        ),
-        row=current_row, col=1
-    )
+    # Graphique des prix principal : ticks bruts en ligne, bougies au-delà
+    if 'open' in chart_df:
+        fig.add_trace(
+            go.Candlestick(
+                x=chart_df['timestamp'],
+                open=chart_df['open'],
+                high=chart_df['high'],
+                low=chart_df['low'],
+                close=chart_df['price'],
+                name=f'Prix {selected_crypto.upper()} ({chart_resolution})',
+                increasing_line_color='#27AE60',
+                decreasing_line_color='#E74C3C'
+            ),
+            row=current_row, col=1
+        )
+    else:
+        fig.add_trace(
+            go.Scatter(
+                x=chart_df['timestamp'], 
+                y=chart_df['price'],
+                mode='lines',
+                name=f'Prix {selected_crypto.upper()}',
+                line=dict(color=colors['price'], width=3),
+                hovertemplate=f'<b>💰 Prix</b>: %{{y:,.2f}} {currency_symbol}<br>' +
+                             '<b>📅 Date</b>: %{x}<br>' +
+                             '<extra></extra>'
+            ),
+            row=current_row, col=1
+        )
     
     # Bollinger Bands avec design amélioré
-    if "Bollinger Bands" in show_indicators and 'bb_upper' in indicators:
+    if "Bollinger Bands" in show_indicators and 'bb_upper' in chart_indicators:
         # Bande supérieure
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['bb_upper'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['bb_upper'],
                 mode='lines',
                 name='BB Supérieure',
                 line=dict(color=colors['bb_upper'], width=1.5, dash='dot'),
                 opacity=0.7,
-                hovertemplate='<b>🔴 BB Sup</b>: %{y:,.2f} €<extra></extra>'
+                hovertemplate=f'<b>🔴 BB Sup</b>: %{{y:,.2f}} {currency_symbol}<extra></extra>'
             ),
             row=current_row, col=1
         )
@@ -210,15 +327,15 @@ if current_data and df is not None and not df.empty:
         # Zone de remplissage entre les bandes
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['bb_lower'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['bb_lower'],
                 mode='lines',
                 name='BB Inférieure',
                 line=dict(color=colors['bb_lower'], width=1.5, dash='dot'),
                 fill='tonexty',
                 fillcolor='rgba(100, 149, 237, 0.1)',
                 opacity=0.7,
-                hovertemplate='<b>🟢 BB Inf</b>: %{y:,.2f} €<extra></extra>'
+                hovertemplate=f'<b>🟢 BB Inf</b>: %{{y:,.2f}} {currency_symbol}<extra></extra>'
             ),
             row=current_row, col=1
         )
@@ -226,13 +343,13 @@ if current_data and df is not None and not df.empty:
         # Moyenne mobile (ligne centrale)
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['bb_middle'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['bb_middle'],
                 mode='lines',
                 name='BB Moyenne',
                 line=dict(color=colors['bb_middle'], width=2, dash='dash'),
                 opacity=0.8,
-                hovertemplate='<b>🔵 BB Moy</b>: %{y:,.2f} €<extra></extra>'
+                hovertemplate=f'<b>🔵 BB Moy</b>: %{{y:,.2f}} {currency_symbol}<extra></extra>'
             ),
             row=current_row, col=1
         )
@@ -245,28 +362,28 @@ if current_data and df is not None and not df.empty:
             'MA200': {'color': colors['ma200'], 'name': 'MA200 (Long terme)', 'width': 3}
         }
         
-        for key, ma in [(k, v) for k, v in indicators.items() if k.startswith('MA')]:
+        for key, ma in [(k, v) for k, v in chart_indicators.items() if k.startswith('MA')]:
             config = ma_config.get(key, {'color': 'gray', 'name': key, 'width': 2})
             fig.add_trace(
                 go.Scatter(
-                    x=df['timestamp'], 
+                    x=chart_df['timestamp'], 
                     y=ma,
                     mode='lines',
                     name=config['name'],
                     line=dict(color=config['color'], width=config['width']),
                     opacity=0.8,
-                    hovertemplate=f'<b>📊 {key}</b>: %{{y:,.2f}} €<extra></extra>'
+                    hovertemplate=f'<b>📊 {key}</b>: %{{y:,.2f}} {currency_symbol}<extra></extra>'
                 ),
                 row=current_row, col=1
             )
     
     # RSI avec design professionnel
-    if "RSI" in show_indicators and 'rsi' in indicators:
+    if "RSI" in show_indicators and 'rsi' in chart_indicators:
         current_row += 1
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['rsi'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['rsi'],
                 mode='lines',
                 name='RSI',
                 line=dict(color=colors['rsi'], width=3),
@@ -275,7 +392,7 @@ if current_data and df is not None and not df.empty:
                 hovertemplate='<b>📊 RSI</b>: %{y:.1f}<br>' +
                              '<b>État</b>: %{customdata}<extra></extra>',
                 customdata=['Suracheté' if x > 70 else 'Survendu' if x < 30 else 'Neutre' 
-                           for x in indicators['rsi']]
+                           for x in chart_indicators['rsi']]
             ),
             row=current_row, col=1
         )
@@ -295,14 +412,14 @@ if current_data and df is not None and not df.empty:
                      opacity=0.5, row=current_row, col=1)
     
     # MACD avec histogramme coloré
-    if "MACD" in show_indicators and 'macd' in indicators:
+    if "MACD" in show_indicators and 'macd' in chart_indicators:
         current_row += 1
         
         # Ligne MACD
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['macd'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['macd'],
                 mode='lines',
                 name='MACD',
                 line=dict(color=colors['macd'], width=3),
@@ -314,8 +431,8 @@ if current_data and df is not None and not df.empty:
         # Ligne Signal
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['signal'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['signal'],
                 mode='lines',
                 name='Signal',
                 line=dict(color=colors['signal'], width=2, dash='dash'),
@@ -326,7 +443,7 @@ if current_data and df is not None and not df.empty:
         
         # Histogramme avec couleurs dynamiques
         histogram_colors = []
-        for i, val in enumerate(indicators['histogram']):
+        for i, val in enumerate(chart_indicators['histogram']):
             if val > 0:
                 histogram_colors.append('#27AE60')  # Vert
             else:
@@ -334,15 +451,15 @@ if current_data and df is not None and not df.empty:
         
         fig.add_trace(
             go.Bar(
-                x=df['timestamp'], 
-                y=indicators['histogram'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['histogram'],
                 name='Histogramme',
                 marker_color=histogram_colors,
                 opacity=0.7,
                 hovertemplate='<b>📊 Histogramme</b>: %{y:.4f}<br>' +
                              '<b>Tendance</b>: %{customdata}<extra></extra>',
                 customdata=['Haussière' if x >= 0 else 'Baissière' 
-                           for x in indicators['histogram']]
+                           for x in chart_indicators['histogram']]
             ),
             row=current_row, col=1
         )
@@ -352,7 +469,7 @@ if current_data and df is not None and not df.empty:
                      row=current_row, col=1)
     
     # Stochastique avec zones critiques
-    if "Stochastique" in show_indicators and 'stoch_k' in indicators:
+    if "Stochastique" in show_indicators and 'stoch_k' in chart_indicators:
         current_row += 1
         
         # Zone critique haute
@@ -365,15 +482,15 @@ if current_data and df is not None and not df.empty:
         # Ligne %K
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['stoch_k'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['stoch_k'],
                 mode='lines',
                 name='%K (Rapide)',
                 line=dict(color=colors['stoch_k'], width=3),
                 hovertemplate='<b>🎯 %K</b>: %{y:.1f}<br>' +
                              '<b>État</b>: %{customdata}<extra></extra>',
                 customdata=['Suracheté' if x > 80 else 'Survendu' if x < 20 else 'Neutre' 
-                           for x in indicators['stoch_k']]
+                           for x in chart_indicators['stoch_k']]
             ),
             row=current_row, col=1
         )
@@ -381,8 +498,8 @@ if current_data and df is not None and not df.empty:
         # Ligne %D
         fig.add_trace(
             go.Scatter(
-                x=df['timestamp'], 
-                y=indicators['stoch_d'],
+                x=chart_df['timestamp'], 
+                y=chart_indicators['stoch_d'],
                 mode='lines',
                 name='%D (Lent)',
                 line=dict(color=colors['stoch_d'], width=2, dash='dash'),
@@ -423,7 +540,10 @@ if current_data and df is not None and not df.empty:
             bordercolor="rgba(0, 0, 0, 0.2)",
             borderwidth=1
         ),
-        margin=dict(l=80, r=80, t=100, b=80)
+        margin=dict(l=80, r=80, t=100, b=80),
+        # La sélection d'une zone recharge la fenêtre au bon niveau de détail
+        dragmode='select',
+        xaxis_rangeslider_visible=False
     )
     
     # Configuration des axes avec titres personnalisés
@@ -432,7 +552,7 @@ if current_data and df is not None and not df.empty:
     
     # Configuration axe principal (prix)
     fig.update_yaxes(
-        title_text="💰 Prix (EUR)", 
+        title_text=f"💰 Prix ({currency_label})", 
         title_standoff=20,
         tickformat=",.0f",
         gridcolor="rgba(128, 128, 128, 0.2)",
@@ -478,8 +598,21 @@ if current_data and df is not None and not df.empty:
         row=rows, col=1
     )
     
-    # Afficher le graphique
-    st.plotly_chart(fig, use_container_width=True)
+    if metrics.ENABLED:
+        metrics.record_stage('dashboard.figure', time.perf_counter() - figure_start, len(chart_df))
+    
+    # Afficher le graphique ; une sélection en boîte sert de zoom
+    st.caption(f"🔍 Résolution : {chart_resolution} - {len(chart_df)} points. "
+               "Sélectionnez une zone du graphique pour zoomer.")
+    chart_event = st.plotly_chart(
+        fig, use_container_width=True, on_select="rerun", selection_mode="box", key="main_chart"
+    )
+    chart_boxes = chart_event.selection.box if chart_event else []
+    if chart_boxes and chart_boxes[0] != st.session_state.get('chart_last_box'):
+        st.session_state['chart_last_box'] = chart_boxes[0]
+        zoom_start, zoom_end = sorted(pd.to_datetime(chart_boxes[0]['x']))
+        st.session_state['chart_zoom'] = {'key': chart_zoom_key, 'range': (zoom_start, zoom_end)}
+        st.rerun()
     
     # Analyse rapide textuelle
     st.subheader("🧠 Analyse Rapide")
@@ -512,59 +645,120 @@ if current_data and df is not None and not df.empty:
         else:
             st.error(f"📉 **Tendance 30j:** {price_change:.1f}% (Baissière)")
     
-    # Tableau de bord multi-crypto amélioré
+    # Tableau de bord multi-crypto (table de synthèse précalculée par le collecteur)
     st.subheader("💎 Tableau de bord Multi-Crypto")
     
-    crypto_data = []
-    for crypto_id in CRYPTOS.keys():
-        if crypto_id in all_current_prices:
-            current = all_current_prices[crypto_id]
-            
-            # Émoji en fonction du changement
-            if current['change_24h'] > 5:
-                emoji = "🚀"
-            elif current['change_24h'] > 0:
-                emoji = "📈"
-            elif current['change_24h'] > -5:
-                emoji = "📉"
-            else:
-                emoji = "💥"
-                
-            crypto_data.append({
-                'Status': emoji,
-                'Cryptomonnaie': CRYPTOS[crypto_id],
-                'Prix (EUR)': f"{current['price']:,.2f} €",
-                'Variation 24h': f"{current['change_24h']:+.2f}%"
-            })
-        else:
-            crypto_data.append({
-                'Status': "❌",
-                'Cryptomonnaie': CRYPTOS[crypto_id],
-                'Prix (EUR)': "Indisponible",
-                'Variation 24h': "N/A"
-            })
-    
-    if crypto_data:
-        df_dashboard = pd.DataFrame(crypto_data)
+    filter_cols = st.columns([3, 2, 2, 1, 1])
+    with filter_cols[0]:
+        summary_search = st.text_input("🔎 Rechercher", "", key="summary_search")
+    with filter_cols[1]:
+        signal_labels = {None: "Tous", 'success': "🟢 Achat", 'warning': "🔴 Prudence", 'neutral': "🔵 Neutre"}
+        summary_signal = st.selectbox(
+            "Signal", options=[None] + SIGNAL_TYPES,
+            format_func=lambda x: signal_labels[x], key="summary_signal"
+        )
+    with filter_cols[2]:
+        summary_sort = st.selectbox("Trier par", list(SORTABLE_COLUMNS.keys()), index=2, key="summary_sort")
+    with filter_cols[3]:
+        summary_ascending = st.toggle("Croissant", value=False, key="summary_ascending")
+    with filter_cols[4]:
+        summary_page_size = st.selectbox("Lignes", [10, 25, 50, 100], index=1, key="summary_page_size")
+    
+    summary_total = load_summary_count(summary_search, summary_signal)
+    page_count = max(1, -(-summary_total // summary_page_size))
+    summary_page = st.number_input(
+        f"Page (sur {page_count})", min_value=1, max_value=page_count, value=1, step=1, key="summary_page"
+    )
+    
+    df_summary = load_summary_page(
+        summary_page, summary_page_size, summary_sort, summary_ascending, summary_search, summary_signal,
+        selected_currency
+    )
+    
+    if df_summary.empty:
+        st.info("💡 Aucune synthèse disponible - lancez une mise à jour des données.")
+    else:
+        def status_emoji(change):
+            if pd.isna(change):
+                return "❌"
+            if change > 5:
+                return "🚀"
+            elif change > 0:
+                return "📈"
+            elif change > -5:
+                return "📉"
+            return "💥"
+        
+        df_dashboard = pd.DataFrame({
+            'Status': df_summary['change_24h'].apply(status_emoji),
+            'Cryptomonnaie': df_summary['name'],
+            f'Prix ({currency_label})': df_summary['price'],
+            'Variation 24h': df_summary['change_24h'],
+            'Variation 7j': df_summary['change_7d'],
+            'RSI': df_summary['rsi'],
+            'Signal': df_summary['signal'],
+            '7 jours': df_summary['sparkline'],
+        })
         
-        # Styling du dataframe
-        def style_dataframe(df):
-            def color_change(val):
-                if 'N/A' in str(val) or 'Indisponible' in str(val):
-                    return 'color: gray'
-                elif '+' in str(val):
-                    return 'color: #00D4AA; font-weight: bold'
-                elif '-' in str(val):
-                    return 'color: #FF6B6B; font-weight: bold'
-                return ''
-            
-            return df.style.applymap(color_change, subset=['Variation 24h'])
+        # Styling limité à la page affichée
+        def color_change(val):
+            if pd.isna(val):
+                return 'color: gray'
+            elif val > 0:
+                return 'color: #00D4AA; font-weight: bold'
+            elif val < 0:
+                return 'color: #FF6B6B; font-weight: bold'
+            return ''
         
         st.dataframe(
-            style_dataframe(df_dashboard), 
+            df_dashboard.style.map(color_change, subset=['Variation 24h', 'Variation 7j']),
             use_container_width=True,
-            hide_index=True
+            hide_index=True,
+            column_config={
+                f'Prix ({currency_label})': st.column_config.NumberColumn(format=f"%.2f {currency_symbol}"),
+                'Variation 24h': st.column_config.NumberColumn(format="%+.2f%%"),
+                'Variation 7j': st.column_config.NumberColumn(format="%+.2f%%"),
+                'RSI': st.column_config.NumberColumn(format="%.1f"),
+                '7 jours': st.column_config.LineChartColumn(),
+            }
         )
+        st.caption(f"{summary_total} cryptos - page {summary_page}/{page_count}")
+    
+    # Corrélations glissantes entre cryptos (rendements en devise de base)
+    st.subheader("🔗 Corrélations et volatilités")
+    metrics.incr('cache_requests', cache='load_correlation')
+    correlation, volatility, correlation_bars = load_correlation(tuple(CRYPTOS.keys()), data_version)
+    corr_assets = st.multiselect(
+        "Cryptos affichées:",
+        options=list(CRYPTOS.keys()),
+        default=list(CRYPTOS.keys())[:20],
+        format_func=lambda x: CRYPTOS[x],
+        key="corr_assets"
+    )
+    if correlation_bars < 2 or not corr_assets:
+        st.info("💡 Pas encore assez de barres communes pour calculer les corrélations.")
+    else:
+        corr_cols = st.columns([3, 1])
+        with corr_cols[0]:
+            corr_view = correlation.loc[corr_assets, corr_assets]
+            labels = [CRYPTOS[crypto] for crypto in corr_assets]
+            corr_fig = px.imshow(
+                corr_view.to_numpy(), x=labels, y=labels, zmin=-1, zmax=1,
+                color_continuous_scale='RdBu_r', aspect='auto', text_auto='.2f' if len(corr_assets) <= 12 else False
+            )
+            corr_fig.update_layout(height=max(400, 25 * len(corr_assets)), margin=dict(l=0, r=0, t=20, b=0))
+            st.plotly_chart(corr_fig, use_container_width=True)
+        with corr_cols[1]:
+            st.dataframe(
+                pd.DataFrame({
+                    'Cryptomonnaie': [CRYPTOS[crypto] for crypto in corr_assets],
+                    'Volatilité annualisée': volatility.loc[corr_assets].to_numpy(),
+                }).sort_values('Volatilité annualisée', ascending=False),
+                use_container_width=True,
+                hide_index=True,
+                column_config={'Volatilité annualisée': st.column_config.NumberColumn(format="%.1f%%")}
+            )
+        st.caption(f"Fenêtre glissante de {correlation_bars} barres de {BAR}, rendements en {BASE_CURRENCY.upper()}")
 
 else:
     st.error(f"❌ Aucune donnée disponible pour {CRYPTOS[selected_crypto]}")
@@ -599,6 +793,39 @@ else:
     
     st.plotly_chart(demo_fig, use_container_width=True)
 
+# Panneau de debug : durées par étape, lignes et accès aux caches
+if debug_metrics:
+    with st.sidebar.expander("🐞 Métriques", expanded=True):
+        metrics_data = metrics.snapshot()
+        if metrics_data['stages']:
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        'Étape': stage,
+                        'Appels': stats['count'],
+                        'Dernier (ms)': stats['last'] * 1000,
+                        'Moyen (ms)': stats['total'] / stats['count'] * 1000,
+                        'Lignes': stats['rows'],
+                    }
+                    for stage, stats in sorted(metrics_data['stages'].items())
+                ]).round(2),
+                hide_index=True
+            )
+        cache_stats = {}
+        for counter in metrics_data['counters']:
+            cache = counter['labels'].get('cache')
+            if cache:
+                stats = cache_stats.setdefault(cache, {'cache_requests': 0, 'cache_misses': 0})
+                stats[counter['name']] = counter['value']
+        for cache, stats in cache_stats.items():
+            hits = stats['cache_requests'] - stats['cache_misses']
+            st.caption(f"{cache} : {hits} hits / {stats['cache_misses']} misses")
+        st.caption(f"Instantané partagé : {data_version}" if data_version else "Instantané partagé : absent (lecture SQLite)")
+        st.download_button("📥 Export Prometheus", metrics.to_prometheus(), file_name="metrics.prom")
+        st.download_button("📥 Export JSONL", metrics.to_jsonl(), file_name="metrics.jsonl")
+        if st.button("♻️ Réinitialiser les métriques"):
+            metrics.reset()
+
 # Footer amélioré
 st.markdown("---")
 st.markdown("""
@@ -2,39 +2,127 @@ import requests
 import sqlite3
 import datetime
 import time
+import os
+import itertools
+import numpy as np
+import metrics
+from concurrent.futures import ThreadPoolExecutor
+from config import DB_PATH, load_config
+from market_summary import refresh_market_summary
+from price_snapshot import publish_snapshot
+from technical_indicators import BASE_CURRENCY, FX_TOLERANCE
+from market_chart_parser import BYTES_PER_POINT, parse_market_chart_stream, timestamps_to_iso
+from alert_system import evaluate_alerts, get_alert_engine
 
-# Liste des cryptos qui fonctionnent bien (sans Polkadot qui bug)
-CRYPTOS = {
+CONFIG = load_config()
+
+# Univers suivi (section `cryptos` de config.yaml) ; Polkadot exclu car il bug
+CRYPTOS = CONFIG.get('cryptos') or {
     'bitcoin': 'Bitcoin (BTC)',
     'ethereum': 'Ethereum (ETH)', 
     'solana': 'Solana (SOL)',
     'cardano': 'Cardano (ADA)'
 }
+DEFAULT_CURRENCY = CONFIG.get('currency', 'eur')
+CURRENCIES = CONFIG.get('currencies') or [DEFAULT_CURRENCY]
+if BASE_CURRENCY not in CURRENCIES:
+    CURRENCIES = [BASE_CURRENCY] + CURRENCIES
+FX_REFERENCE = CONFIG.get('fx_reference', 'bitcoin')
+
+API_CONFIG = CONFIG.get('api', {})
+# Surchargeable pour viser le simulateur local (coingecko_simulator.py)
+API_BASE_URL = (os.environ.get('COINGECKO_API_URL') or API_CONFIG.get('base_url')
+                or 'https://api.coingecko.com/api/v3').rstrip('/')
+MAX_RETRIES = API_CONFIG.get('max_retries', 3)
+RETRY_BACKOFF = API_CONFIG.get('retry_backoff', 1.0)
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_IDS_PER_REQUEST = API_CONFIG.get('max_ids_per_request', 250)
+MAX_URL_LENGTH = API_CONFIG.get('max_url_length', 2000)
+MAX_WORKERS = API_CONFIG.get('max_workers', 4)
+
+# Session partagée : les connexions HTTPS sont réutilisées entre les requêtes
+_session = requests.Session()
+_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_WORKERS))
+_session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_WORKERS))
+
+def _get(url, timeout=30, stream=False):
+    """GET avec nouvelles tentatives sur 429 (Retry-After) et erreurs 5xx"""
+    for attempt in range(MAX_RETRIES + 1):
+        response = _session.get(url, timeout=timeout, stream=stream)
+        retryable = response.status_code == 429 or response.status_code >= 500
+        if not retryable or attempt == MAX_RETRIES:
+            response.raise_for_status()
+            return response
+        response.close()
+        metrics.incr('http_retries', status=response.status_code)
+        retry_after = response.headers.get('Retry-After')
+        delay = float(retry_after) if retry_after and retry_after.isdigit() else RETRY_BACKOFF * 2 ** attempt
+        time.sleep(delay)
+
+def _get_json(url, timeout=30):
+    return _get(url, timeout).json()
+
+def _stream_market_chart(url):
+    """Lit en flux le tableau `prices` d'une réponse market_chart (lève en cas d'échec)"""
+    with _get(url, timeout=60, stream=True) as response:
+        length = int(response.headers.get('Content-Length') or 0)
+        return parse_market_chart_stream(
+            response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+            capacity=length // BYTES_PER_POINT or 1024
+        )
+
+def fetch_historical_arrays(crypto='bitcoin', days=30, currency=None):
+    """Récupère les prix historiques d'une crypto sous forme de tableaux NumPy
 
-def fetch_historical_prices(crypto='bitcoin', days=30, currency='eur'):
-    """Récupère les prix historiques d'une crypto"""
-    url = f'https://api.coingecko.com/api/v3/coins/{crypto}/market_chart?vs_currency={currency}&days={days}'
+    La réponse est lue en flux et le tableau `prices` est parsé par
+    morceaux dans des buffers int64 (timestamps ms) / float64 (prix), sans
+    objet Python par point. Retourne (timestamps_ms, prix), vides en cas d'erreur.
+    """
+    currency = currency or BASE_CURRENCY
+    url = f'{API_BASE_URL}/coins/{crypto}/market_chart?vs_currency={currency}&days={days}'
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        prices = data['prices']  # liste de [timestamp_ms, price]
-        
-        # Convertir timestamp ms en datetime ISO8601 string
-        formatted_prices = []
-        for p in prices:
-            dt = datetime.datetime.fromtimestamp(p[0] / 1000).isoformat()
-            formatted_prices.append((dt, p[1]))
-        return formatted_prices
+        with metrics.timed('coingecko.market_chart') as t:
+            timestamps, prices = _stream_market_chart(url)
+            t.rows = len(timestamps)
+        return timestamps, prices
     except Exception as e:
         print(f"Erreur lors de la récupération des prix pour {crypto}: {e}")
-        return []
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
 
-def store_historical_prices(prices, crypto='bitcoin'):
-    """Stocke les prix historiques en base"""
-    conn = sqlite3.connect('crypto_data.db')
-    cursor = conn.cursor()
-    
+def fetch_range_arrays(crypto, start, end, currency=None):
+    """Prix d'une crypto entre deux timestamps epoch (s) via market_chart/range
+
+    Granularité choisie par CoinGecko selon la durée (fine <= 1 j,
+    horaire <= 90 j, journalière au-delà). Les erreurs sont propagées pour
+    que l'appelant puisse retenter la plage.
+    """
+    currency = currency or BASE_CURRENCY
+    url = (f'{API_BASE_URL}/coins/{crypto}/market_chart/range'
+           f'?vs_currency={currency}&from={int(start)}&to={int(end)}')
+    with metrics.timed('coingecko.market_chart_range') as t:
+        timestamps, prices = _stream_market_chart(url)
+        t.rows = len(timestamps)
+    return timestamps, prices
+
+def fetch_historical_prices(crypto='bitcoin', days=30, currency=None):
+    """Récupère les prix historiques d'une crypto (devise de base par défaut)"""
+    timestamps, prices = fetch_historical_arrays(crypto, days, currency)
+    # Convertir timestamp ms en datetime ISO8601 string
+    with metrics.timed('collector.parse_prices') as t:
+        formatted_prices = list(zip(timestamps_to_iso(timestamps).tolist(), prices.tolist()))
+        t.rows = len(formatted_prices)
+    return formatted_prices
+
+def _crypto_timestamp_indexes(cursor):
+    """{nom: unique} des index de `prices` portant exactement sur (crypto, timestamp)"""
+    indexes = {}
+    for _seq, name, unique, *_ in cursor.execute('PRAGMA index_list(prices)').fetchall():
+        columns = [row[2] for row in cursor.execute(f'PRAGMA index_info("{name}")')]
+        if columns == ['crypto', 'timestamp']:
+            indexes[name] = bool(unique)
+    return indexes
+
+def _init_prices_table(cursor):
     # Créer la table si elle n'existe pas
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS prices (
@@ -45,100 +133,296 @@ def store_historical_prices(prices, crypto='bitcoin'):
             UNIQUE(crypto, timestamp)
         )
     ''')
+    # Un seul index unique (crypto, timestamp) : il sert aux lectures par
+    # fenêtre de temps et au dédoublonnage de INSERT OR IGNORE
+    indexes = _crypto_timestamp_indexes(cursor)
+    if not any(indexes.values()):
+        # Base créée sans contrainte UNIQUE : retirer les doublons accumulés (la première ligne reste)
+        cursor.execute('DROP INDEX IF EXISTS idx_prices_crypto_timestamp')
+        cursor.execute('DELETE FROM prices WHERE id NOT IN (SELECT MIN(id) FROM prices GROUP BY crypto, timestamp)')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_prices_crypto_timestamp ON prices (crypto, timestamp)')
+    elif indexes.get('idx_prices_crypto_timestamp') is False:
+        # Doublon exact de l'index de UNIQUE(crypto, timestamp) : double coût à chaque insertion
+        cursor.execute('DROP INDEX idx_prices_crypto_timestamp')
+
+def store_historical_prices(prices, crypto='bitcoin'):
+    """Stocke les prix historiques en base"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    _init_prices_table(cursor)
     
-    # Insérer les données
-    for timestamp, price in prices:
-        try:
-            cursor.execute('INSERT INTO prices (crypto, price, timestamp) VALUES (?, ?, ?)',
-                           (crypto, price, timestamp))
-        except sqlite3.IntegrityError:
-            # Ignorer les doublons
-            pass
-    
+    # Insérer les données (les doublons sont ignorés grâce à l'index unique)
+    with metrics.timed('collector.store_prices') as t:
+        cursor.executemany('INSERT OR IGNORE INTO prices (crypto, price, timestamp) VALUES (?, ?, ?)',
+                           ((crypto, price, timestamp) for timestamp, price in prices))
+        conn.commit()
+        t.rows = cursor.rowcount
+    conn.close()
+
+def store_price_arrays(crypto, timestamps, prices):
+    """Stocke en bloc des tableaux (timestamps ms, prix) issus du parseur en flux
+
+    Les timestamps sont convertis en texte ISO en une seule opération
+    vectorisée ; seule la liaison des paramètres par sqlite3 crée encore
+    une valeur Python par point, sans liste intermédiaire de tuples.
+    Renvoie le nombre de lignes réellement insérées (doublons exclus).
+    """
+    valid = ~np.isnan(prices)
+    timestamps, prices = timestamps[valid], prices[valid]
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    _init_prices_table(cursor)
+    with metrics.timed('collector.store_prices') as t:
+        iso = timestamps_to_iso(timestamps)
+        cursor.executemany('INSERT OR IGNORE INTO prices (crypto, price, timestamp) VALUES (?, ?, ?)',
+                           zip(itertools.repeat(crypto), prices.tolist(), iso.tolist()))
+        conn.commit()
+        # executemany cumule les lignes insérées ; celles ignorées ne comptent pas
+        stored = t.rows = cursor.rowcount
+    conn.close()
+    return stored
+
+def _simple_price_url(ids, currencies):
+    return (f"{API_BASE_URL}/simple/price?ids={','.join(ids)}"
+            f"&vs_currencies={','.join(currencies)}&include_24hr_change=true")
+
+def chunk_ids(ids, currencies, max_ids=None, max_url_length=None):
+    """Découpe les ids en lots respectant la limite d'ids et la longueur d'URL"""
+    max_ids = max_ids or MAX_IDS_PER_REQUEST
+    max_url_length = max_url_length or MAX_URL_LENGTH
+    base_length = len(_simple_price_url([], currencies))
+    chunks, current, length = [], [], base_length
+    for crypto_id in ids:
+        extra = len(crypto_id) + (1 if current else 0)
+        if current and (len(current) >= max_ids or length + extra > max_url_length):
+            chunks.append(current)
+            current, length, extra = [], base_length, len(crypto_id)
+        current.append(crypto_id)
+        length += extra
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _fetch_price_chunk(ids, currencies):
+    with metrics.timed('coingecko.simple_price') as t:
+        data = _get_json(_simple_price_url(ids, currencies))
+        t.rows = len(data)
+    return data
+
+def fetch_price_snapshot(ids=None, currencies=None):
+    """Prix actuels de tout l'univers dans plusieurs devises
+
+    Les ids sont découpés en lots (limite d'ids et longueur d'URL), les lots
+    sont demandés en parallèle avec toutes les devises à la fois, puis
+    fusionnés. Retourne {crypto_id: {devise: {'price', 'change_24h'}}} ;
+    les cryptos absentes ou en erreur ont un prix à 0.
+    """
+    ids = list(ids or CRYPTOS.keys())
+    currencies = list(currencies or CURRENCIES)
+    chunks = chunk_ids(ids, currencies)
+
+    print(f"🔍 Récupération des prix actuels ({len(ids)} cryptos, {len(chunks)} requêtes)...")
+    merged = {}
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks)) or 1) as executor:
+        futures = [executor.submit(_fetch_price_chunk, chunk, currencies) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                merged.update(future.result())
+            except Exception as e:
+                print(f"❌ Erreur lors de la récupération des prix actuels ({len(chunk)} cryptos): {e}")
+
+    snapshot = {}
+    for crypto_id in ids:
+        data = merged.get(crypto_id, {})
+        snapshot[crypto_id] = {
+            currency: {
+                'price': data.get(currency, 0),
+                'change_24h': data.get(f'{currency}_24h_change', 0) or 0
+            }
+            for currency in currencies
+        }
+    print(f"✅ Prix actuels récupérés pour {sum(1 for c in ids if c in merged)}/{len(ids)} cryptos")
+    return snapshot
+
+def fetch_all_current_prices(currency=None):
+    """Récupère tous les prix actuels dans une devise"""
+    currency = currency or DEFAULT_CURRENCY
+    currencies = CURRENCIES if currency in CURRENCIES else [currency]
+    snapshot = fetch_price_snapshot(currencies=currencies)
+    return {crypto_id: prices[currency] for crypto_id, prices in snapshot.items()}
+
+def _naive_epoch(dt):
+    """Secondes d'un datetime naïf, sur la même horloge que les timestamps de `prices`"""
+    return dt.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+def store_fx_rates(currency, rates):
+    """Stocke une série de taux [(timestamp_s, taux)] pour 1 unité de la devise de base"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fx_rates (
+            currency TEXT,
+            timestamp INTEGER,
+            rate REAL,
+            PRIMARY KEY (currency, timestamp)
+        ) WITHOUT ROWID
+    ''')
+    conn.executemany('INSERT OR REPLACE INTO fx_rates (currency, timestamp, rate) VALUES (?, ?, ?)',
+                     [(currency, int(ts), rate) for ts, rate in rates])
     conn.commit()
     conn.close()
 
-def fetch_all_current_prices(currency='eur'):
-    """Récupère tous les prix actuels en une seule requête"""
-    crypto_ids = ','.join(CRYPTOS.keys())
-    url = f'https://api.coingecko.com/api/v3/simple/price?ids={crypto_ids}&vs_currencies={currency}&include_24hr_change=true'
-    
+def update_fx_rates_from_snapshot(snapshot, timestamp=None):
+    """Taux actuels déduits des cotations multi-devises (médiane des ratios)"""
+    timestamp = timestamp or _naive_epoch(datetime.datetime.now())
+    for currency in CURRENCIES:
+        if currency == BASE_CURRENCY:
+            continue
+        ratios = sorted(
+            quotes[currency]['price'] / quotes[BASE_CURRENCY]['price']
+            for quotes in snapshot.values()
+            if quotes[BASE_CURRENCY]['price'] and quotes[currency]['price']
+        )
+        if ratios:
+            store_fx_rates(currency, [(timestamp, ratios[len(ratios) // 2])])
+
+def _fx_rates(base, quoted):
+    """Taux [(timestamp_s, taux)] aux heures où la crypto de référence est cotée dans les deux devises"""
+    base_by_time = {datetime.datetime.fromisoformat(ts).replace(minute=0, second=0, microsecond=0): price
+                    for ts, price in base}
+    rates = []
+    for ts, price in quoted:
+        hour = datetime.datetime.fromisoformat(ts).replace(minute=0, second=0, microsecond=0)
+        base_price = base_by_time.get(hour)
+        if base_price:
+            rates.append((_naive_epoch(hour), price / base_price))
+    return rates
+
+def _range_reference_prices(start, end, currency):
+    """Prix [(timestamp ISO, prix)] de la crypto de référence entre deux epochs (s), vide en cas d'erreur"""
     try:
-        print(f"🔍 Récupération des prix actuels...")
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        
-        result = {}
-        for crypto_id in CRYPTOS.keys():
-            if crypto_id in data:
-                result[crypto_id] = {
-                    'price': data[crypto_id][currency],
-                    'change_24h': data[crypto_id].get(f'{currency}_24h_change', 0)
-                }
-            else:
-                result[crypto_id] = {'price': 0, 'change_24h': 0}
-        
-        print(f"✅ Prix actuels récupérés pour {len(result)} cryptos")
-        return result
-        
+        timestamps, prices = fetch_range_arrays(FX_REFERENCE, start, end, currency)
     except Exception as e:
-        print(f"❌ Erreur lors de la récupération des prix actuels: {e}")
-        # Retourner des valeurs par défaut
-        return {crypto_id: {'price': 0, 'change_24h': 0} for crypto_id in CRYPTOS.keys()}
-
-def fetch_all_current_prices(currency='eur'):
-    """Récupère tous les prix actuels en une seule requête"""
-    crypto_ids = ','.join(CRYPTOS.keys())
-    url = f'https://api.coingecko.com/api/v3/simple/price?ids={crypto_ids}&vs_currencies={currency}&include_24hr_change=true'
-    
+        print(f"Erreur lors de la récupération de l'historique {currency.upper()} de {FX_REFERENCE}: {e}")
+        return []
+    return list(zip(timestamps_to_iso(timestamps).tolist(), prices.tolist()))
+
+def _first_price_epoch():
+    """Plus ancien prix de l'univers suivi (horloge de `_naive_epoch`), None si aucun"""
+    conn = sqlite3.connect(DB_PATH)
     try:
-        print(f"🔍 Récupération des prix actuels...")
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        
-        result = {}
-        for crypto_id in CRYPTOS.keys():
-            if crypto_id in data:
-                result[crypto_id] = {
-                    'price': data[crypto_id][currency],
-                    'change_24h': data[crypto_id].get(f'{currency}_24h_change', 0)
-                }
-            else:
-                result[crypto_id] = {'price': 0, 'change_24h': 0}
-        
-        print(f"✅ Prix actuels récupérés pour {len(result)} cryptos")
-        return result
-        
-    except Exception as e:
-        print(f"❌ Erreur lors de la récupération des prix actuels: {e}")
-        # Retourner des valeurs par défaut
-        return {crypto_id: {'price': 0, 'change_24h': 0} for crypto_id in CRYPTOS.keys()}
+        # Une recherche dans l'index (crypto, timestamp) par crypto
+        firsts = [conn.execute('SELECT MIN(timestamp) FROM prices WHERE crypto = ?', (crypto,)).fetchone()[0]
+                  for crypto in CRYPTOS]
+    except sqlite3.OperationalError:
+        firsts = []
+    finally:
+        conn.close()
+    firsts = [datetime.datetime.fromisoformat(first) for first in firsts if first]
+    return _naive_epoch(min(firsts)) if firsts else None
+
+def _first_fx_epoch(currency):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return conn.execute('SELECT MIN(timestamp) FROM fx_rates WHERE currency = ?', (currency,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
 
-def fetch_current_price(crypto='bitcoin', currency='eur'):
+def update_fx_history(days=30):
+    """Historique des taux : une crypto de référence cotée dans chaque devise
+
+    Coûte une requête market_chart par devise, au lieu d'un historique
+    complet par crypto et par devise. Si des prix en base (historique
+    existant, rattrapage) sont plus anciens que le premier taux connu, une
+    requête market_chart/range par devise complète les taux jusqu'au plus
+    ancien prix (granularité journalière au-delà de 90 jours).
+    """
+    base = fetch_historical_prices(FX_REFERENCE, days=days, currency=BASE_CURRENCY)
+    first_price = _first_price_epoch()
+    for currency in CURRENCIES:
+        if currency == BASE_CURRENCY:
+            continue
+        rates = _fx_rates(base, fetch_historical_prices(FX_REFERENCE, days=days, currency=currency)) if base else []
+
+        known = [ts for ts in (_first_fx_epoch(currency), rates[0][0] if rates else None) if ts is not None]
+        if first_price is not None and (not known or first_price < min(known) - FX_TOLERANCE):
+            # Marge d'un jour avant le premier prix : le taux journalier précédent est inclus
+            start = first_price - FX_TOLERANCE
+            end = min(known) if known else _naive_epoch(datetime.datetime.now())
+            older = _fx_rates(_range_reference_prices(start, end, BASE_CURRENCY),
+                              _range_reference_prices(start, end, currency))
+            if older:
+                print(f"✅ {len(older)} taux {BASE_CURRENCY.upper()}/{currency.upper()} rattrapés "
+                      f"depuis {datetime.datetime.fromtimestamp(older[0][0], datetime.timezone.utc):%Y-%m-%d}")
+            rates = older + rates
+        if rates:
+            store_fx_rates(currency, rates)
+            print(f"✅ {len(rates)} taux {BASE_CURRENCY.upper()}/{currency.upper()} stockés")
+
+def fetch_current_price(crypto='bitcoin', currency=None):
     """Fonction de compatibilité - utilise le cache global"""
     all_prices = fetch_all_current_prices(currency)
     return all_prices.get(crypto, {'price': 0, 'change_24h': 0})
 
-def fetch_price(crypto='bitcoin', currency='eur'):
+def fetch_price(crypto='bitcoin', currency=None):
     """Fonction de compatibilité - récupère juste le prix"""
     current_data = fetch_current_price(crypto, currency)
     return current_data['price']
 
-def update_all_cryptos(days=30):
-    """Met à jour toutes les cryptos en base"""
-    print("Mise à jour de toutes les cryptomonnaies...")
+def ingest_all_cryptos(days=30):
+    """Récupère et stocke l'historique de toutes les cryptos ; renvoie le nombre de prix reçus"""
+    total = 0
     for crypto_id in CRYPTOS.keys():
         print(f"Récupération de {CRYPTOS[crypto_id]}...")
-        prices = fetch_historical_prices(crypto_id, days=days)
-        if prices:
-            store_historical_prices(prices, crypto_id)
-            print(f"✅ {len(prices)} prix stockés pour {CRYPTOS[crypto_id]}")
+        timestamps, prices = fetch_historical_arrays(crypto_id, days=days)
+        if len(timestamps):
+            stored = store_price_arrays(crypto_id, timestamps, prices)
+            total += len(timestamps)
+            print(f"✅ {stored} nouveaux prix stockés sur {len(timestamps)} reçus pour {CRYPTOS[crypto_id]}")
         else:
             print(f"❌ Erreur pour {CRYPTOS[crypto_id]}")
 
+    # Publier l'instantané partagé lu par les processus du dashboard
+    version = publish_snapshot()
+    if version:
+        print(f"✅ Instantané {version} publié")
+    return total
+
+def update_all_cryptos(days=30):
+    """Met à jour toutes les cryptos en base"""
+    print("Mise à jour de toutes les cryptomonnaies...")
+    ingest_all_cryptos(days)
+
+    # Combler les trous laissés par les cycles en échec (import local : backfill dépend de ce module)
+    from backfill import backfill
+    with metrics.timed('collector.backfill') as t:
+        t.rows = backfill()['stored']
+
+    # Taux de change : historique via la crypto de référence + taux actuels
+    update_fx_history(days=days)
+    snapshot = fetch_price_snapshot()
+    update_fx_rates_from_snapshot(snapshot)
+
+    # Recalculer la table de synthèse utilisée par le tableau multi-crypto
+    current_prices = {crypto_id: quotes[BASE_CURRENCY] for crypto_id, quotes in snapshot.items()}
+    with metrics.timed('collector.market_summary') as t:
+        count = refresh_market_summary(CRYPTOS, current_prices)
+        t.rows = count
+    print(f"✅ Synthèse mise à jour pour {count} cryptos")
+
+    # Évaluer les alertes configurées ; l'envoi se fait en arrière-plan
+    with metrics.timed('collector.alerts') as t:
+        triggered = evaluate_alerts(snapshot)
+        t.rows = triggered
+    if triggered:
+        print(f"🔔 {triggered} alerte(s) en file d'envoi")
+
 if __name__ == "__main__":
     # Mettre à jour toutes les cryptos
     update_all_cryptos()
-    print("✅ Mise à jour terminée !")
\ No newline at end of file
+    # Envoyer les alertes en attente avant de quitter
+    get_alert_engine().stop()
+    print("✅ Mise à jour terminée !")
+    if metrics.ENABLED:
+        metrics.export_jsonl(os.environ.get('CRYPTO_METRICS_FILE', 'metrics.jsonl'))
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""Générateur de charge du collecteur contre le simulateur CoinGecko
+
+Démarre le simulateur local (ou vise --base-url), pointe le collecteur
+dessus avec une base SQLite temporaire, enchaîne des cycles de collecte et
+mesure le débit d'ingestion (lignes/s) et le retard des données les plus
+récentes en base par rapport à l'horloge.
+
+    python load_generator.py --assets 200 --cycles 3 --days 1 --latency 20 --rate-limit 50
+    python load_generator.py --assets 500 --full-cycle --error-rate 0.02
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assets', type=int, default=100)
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--days', default='1', help='fenêtre market_chart demandée à chaque cycle')
+    parser.add_argument('--pause', type=float, default=0.0, help='secondes entre deux cycles')
+    parser.add_argument('--latency', type=float, default=0.0, help='latence simulée (ms)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='variation de latence simulée (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='requêtes/s avant 429 (0 = illimité)')
+    parser.add_argument('--interval', type=int, default=300, help='pas des séries synthétiques (s)')
+    parser.add_argument('--replay', metavar='DIR', help='rejoue des réponses enregistrées')
+    parser.add_argument('--base-url', help='simulateur déjà lancé (sinon démarré ici)')
+    parser.add_argument('--db', help='base SQLite cible (temporaire par défaut)')
+    parser.add_argument('--full-cycle', action='store_true',
+                        help='cycle complet update_all_cryptos (taux, synthèse, alertes) au lieu de la seule ingestion')
+    return parser.parse_args()
+
+def count_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+
+def freshness(db_path):
+    """Retard (s) entre maintenant et la donnée la plus récente de chaque crypto"""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT crypto, MAX(timestamp) FROM prices GROUP BY crypto').fetchall()
+    conn.close()
+    now = datetime.datetime.now()
+    return [(now - datetime.datetime.fromisoformat(ts)).total_seconds() for _, ts in rows if ts]
+
+def main():
+    args = parse_args()
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='crypto-load-'), 'load.db')
+
+    simulator = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        from coingecko_simulator import CoinGeckoSimulator
+        simulator = CoinGeckoSimulator(
+            n_assets=args.assets, latency=args.latency / 1000, jitter=args.jitter / 1000,
+            error_rate=args.error_rate, rate_limit=args.rate_limit, interval=args.interval,
+            replay_dir=args.replay
+        ).start()
+        base_url = simulator.base_url
+
+    # Les modules lisent ces variables à l'import
+    os.environ['CRYPTO_DB_PATH'] = db_path
+    os.environ['COINGECKO_API_URL'] = base_url
+    import data_collector
+    import alert_system
+    from coingecko_simulator import simulated_ids
+
+    data_collector.CRYPTOS.clear()
+    data_collector.CRYPTOS.update({crypto: crypto for crypto in simulated_ids(args.assets)})
+    # Pas d'envoi d'emails pendant la charge
+    alert_system._engine = alert_system.AlertEngine([], alert_system.SMTPPool('localhost', 0, ''), [])
+
+    print(f"🧪 {args.assets} cryptos, {args.cycles} cycles, API {base_url}, base {db_path}")
+    results = []
+    for cycle in range(1, args.cycles + 1):
+        before = count_rows(db_path)
+        start = time.perf_counter()
+        if args.full_cycle:
+            data_collector.update_all_cryptos(days=args.days)
+            received = None
+        else:
+            received = data_collector.ingest_all_cryptos(days=args.days)
+        elapsed = time.perf_counter() - start
+        inserted = count_rows(db_path) - before
+        delays = freshness(db_path)
+        results.append((elapsed, inserted, received, delays))
+        if args.pause and cycle < args.cycles:
+            time.sleep(args.pause)
+
+    print("\n📊 Résultats")
+    for cycle, (elapsed, inserted, received, delays) in enumerate(results, 1):
+        received_text = '' if received is None else f", {received / elapsed:,.0f} prix reçus/s"
+        delay_text = (f"retard p50 {statistics.median(delays):.0f} s, max {max(delays):.0f} s"
+                      if delays else "aucune donnée")
+        print(f"Cycle {cycle} : {elapsed:.2f} s, {inserted} lignes insérées "
+              f"({inserted / elapsed:,.0f} lignes/s{received_text}), {delay_text}")
+    total_elapsed = sum(r[0] for r in results)
+    total_inserted = sum(r[1] for r in results)
+    print(f"Total : {total_inserted} lignes en {total_elapsed:.2f} s -> {total_inserted / total_elapsed:,.0f} lignes/s")
+    if simulator:
+        print(f"Simulateur : {simulator.stats}")
+        simulator.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import re
+import time
+import numpy as np
+
+# Taille moyenne d'un point "[1719194617001,91010.50731326574]," dans le JSON
+BYTES_PER_POINT = 36
+
+_ARRAY_END = re.compile(rb'\]\s*\]')
+
+class PriceBuffer:
+    """Tableaux int64 (timestamps ms) / float64 (prix) préalloués, agrandis par doublement"""
+
+    def __init__(self, capacity=1024):
+        capacity = max(int(capacity), 16)
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def extend(self, timestamps, prices):
+        needed = self.size + len(timestamps)
+        if needed > len(self.timestamps):
+            capacity = max(needed, 2 * len(self.timestamps))
+            self.timestamps = np.resize(self.timestamps, capacity)
+            self.prices = np.resize(self.prices, capacity)
+        self.timestamps[self.size:needed] = timestamps
+        self.prices[self.size:needed] = prices
+        self.size = needed
+
+    def arrays(self):
+        return self.timestamps[:self.size], self.prices[:self.size]
+
+def _parse_pairs(segment):
+    """Convertit '[t,p],[t,p],...' en deux tableaux, en un seul appel NumPy"""
+    text = segment.translate(None, b'[]').replace(b'null', b'nan').strip(b' \t\r\n,')
+    if not text:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    values = np.fromstring(text.decode('ascii'), dtype=np.float64, sep=',')
+    if len(values) % 2:
+        raise ValueError("Tableau 'prices' mal formé")
+    pairs = values.reshape(-1, 2)
+    return pairs[:, 0].astype(np.int64), pairs[:, 1]
+
+def parse_market_chart_stream(chunks, capacity=1024, key=b'"prices"'):
+    """Parse le tableau `prices` d'une réponse market_chart lue par morceaux
+
+    Le JSON n'est jamais chargé en entier : chaque morceau complet de
+    paires [timestamp_ms, prix] est converti directement en tableaux NumPy
+    et copié dans des buffers préalloués. Retourne (timestamps_ms, prix).
+    """
+    buffer = PriceBuffer(capacity)
+    pending = b''
+    in_array = False
+    for chunk in chunks:
+        pending += chunk
+        if not in_array:
+            start = pending.find(key)
+            if start < 0:
+                # Garder de quoi reconnaître la clé coupée entre deux morceaux
+                pending = pending[-len(key):]
+                continue
+            bracket = pending.find(b'[', start + len(key))
+            if bracket < 0:
+                continue
+            pending = pending[bracket + 1:]
+            in_array = True
+
+        if pending.lstrip().startswith(b']'):
+            # Fin du tableau juste après une paire complète (ou tableau vide)
+            return buffer.arrays()
+        end = _ARRAY_END.search(pending)
+        if end is not None:
+            buffer.extend(*_parse_pairs(pending[:end.start() + 1]))
+            return buffer.arrays()
+        last = pending.rfind(b']')
+        if last >= 0:
+            buffer.extend(*_parse_pairs(pending[:last + 1]))
+            pending = pending[last + 1:]
+
+    if in_array and pending.strip():
+        raise ValueError("Réponse market_chart tronquée")
+    return buffer.arrays()
+
+def _local_offsets(seconds):
+    """Décalage UTC local (s) de chaque timestamp epoch, comme time.localtime()
+
+    Le décalage est sondé une fois par jour sur l'étendue du lot (au plus
+    un changement d'heure par jour), puis chaque changement est localisé à
+    la seconde par dichotomie : le coût dépend de la durée couverte, pas du
+    nombre de points, et un lot à cheval sur plusieurs changements d'heure
+    (historique `days=max`) reste exact.
+    """
+    def offset(t):
+        return time.localtime(t).tm_gmtoff
+
+    first, last = int(seconds.min()), int(seconds.max())
+    probes = list(range(first, last, 86400)) + [last]
+    values = [offset(t) for t in probes]
+    starts, offsets = [first], [values[0]]
+    for a, b, before, after in zip(probes, probes[1:], values, values[1:]):
+        if before == after:
+            continue
+        # Premier instant portant le nouveau décalage
+        while b - a > 1:
+            middle = (a + b) // 2
+            if offset(middle) == before:
+                a = middle
+            else:
+                b = middle
+        starts.append(b)
+        offsets.append(after)
+    return np.asarray(offsets)[np.searchsorted(starts, seconds, side='right') - 1]
+
+def timestamps_to_iso(timestamps_ms):
+    """Timestamps ms -> chaînes ISO en heure locale, identiques à datetime.fromtimestamp(...).isoformat()
+
+    Conversion vectorisée ; le décalage horaire local de chaque point tient
+    compte de tous les changements d'heure couverts par le lot.
+    """
+    if len(timestamps_ms) == 0:
+        return np.empty(0, dtype=str)
+    offsets = _local_offsets(timestamps_ms // 1000)
+    local = timestamps_ms.astype('datetime64[ms]') + offsets.astype('timedelta64[s]')
+
+    iso = np.datetime_as_string(local.astype('datetime64[us]'), unit='us')
+    # isoformat() n'affiche les microsecondes que si elles sont non nulles
+    whole = timestamps_ms % 1000 == 0
+    if whole.any():
+        iso[whole] = iso[whole].astype('U19')
+    return iso
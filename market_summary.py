@@ -0,0 +1,174 @@
+import json
+import sqlite3
+import datetime
+import pandas as pd
+from config import DB_PATH
+from technical_indicators import BASE_CURRENCY, generate_signals, get_fx_rates, get_recent_indicators
+
+# Nombre de points conservés pour la mini-courbe (7 jours, un point toutes les 4h)
+SPARKLINE_DAYS = 7
+SPARKLINE_POINTS = 42
+
+# Colonnes triables exposées au dashboard (libellé -> colonne SQL)
+SORTABLE_COLUMNS = {
+    'Cryptomonnaie': 'name',
+    'Prix': 'price',
+    'Variation 24h': 'change_24h',
+    'Variation 7j': 'change_7d',
+    'RSI': 'rsi',
+}
+
+SIGNAL_TYPES = ['success', 'warning', 'neutral']
+
+def init_summary_table(conn):
+    """Crée la table de synthèse par crypto et ses index de tri"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS market_summary (
+            crypto TEXT PRIMARY KEY,
+            name TEXT,
+            price REAL,
+            change_24h REAL,
+            change_7d REAL,
+            rsi REAL,
+            signal TEXT,
+            signal_type TEXT,
+            sparkline TEXT,
+            updated_at TEXT
+        )
+    ''')
+    # Un index par colonne triable : ORDER BY ... LIMIT lit seulement la page
+    for column in SORTABLE_COLUMNS.values():
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_summary_{column} ON market_summary ({column})')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_summary_signal_type ON market_summary (signal_type)')
+    conn.commit()
+
+def _change_since(df, delta):
+    """Variation en % entre le dernier prix et le prix à (dernier - delta)"""
+    last_time = df['timestamp'].iloc[-1]
+    past = df[df['timestamp'] <= last_time - delta]
+    if past.empty:
+        return None
+    past_price = past['price'].iloc[-1]
+    if not past_price:
+        return None
+    return (df['price'].iloc[-1] - past_price) / past_price * 100
+
+def _sparkline(df):
+    """Sous-échantillonne les derniers jours en une liste courte de prix"""
+    last_time = df['timestamp'].iloc[-1]
+    recent = df[df['timestamp'] >= last_time - pd.Timedelta(days=SPARKLINE_DAYS)]
+    step = max(1, len(recent) // SPARKLINE_POINTS)
+    return [round(float(p), 6) for p in recent['price'].iloc[::step]]
+
+def compute_asset_summary(crypto, name, current=None):
+    """Calcule la ligne de synthèse d'une crypto à partir des 30 derniers jours en base"""
+    result = get_recent_indicators(crypto)
+    if result is None:
+        return None
+    df, indicators = result
+
+    price = df['price'].iloc[-1]
+    change_24h = _change_since(df, pd.Timedelta(hours=24))
+    if current and current.get('price'):
+        price = current['price']
+        change_24h = current.get('change_24h', change_24h)
+
+    rsi = indicators['rsi'].iloc[-1]
+    signals = generate_signals(df, indicators) if len(df) > 1 else []
+    if signals:
+        signal, signal_type = signals[0]['title'], signals[0]['type']
+    else:
+        signal, signal_type = 'Neutre', 'neutral'
+
+    return {
+        'crypto': crypto,
+        'name': name,
+        'price': float(price),
+        'change_24h': None if change_24h is None else float(change_24h),
+        'change_7d': _change_since(df, pd.Timedelta(days=7)),
+        'rsi': None if pd.isna(rsi) else float(rsi),
+        'signal': signal,
+        'signal_type': signal_type,
+        'sparkline': json.dumps(_sparkline(df)),
+        'updated_at': datetime.datetime.now().isoformat(),
+    }
+
+def refresh_market_summary(cryptos, current_prices=None):
+    """Recalcule la table de synthèse pour toutes les cryptos suivies"""
+    current_prices = current_prices or {}
+    rows = []
+    for crypto_id, name in cryptos.items():
+        summary = compute_asset_summary(crypto_id, name, current_prices.get(crypto_id))
+        if summary is not None:
+            rows.append(summary)
+
+    conn = sqlite3.connect(DB_PATH)
+    init_summary_table(conn)
+    conn.executemany('''
+        INSERT OR REPLACE INTO market_summary
+            (crypto, name, price, change_24h, change_7d, rsi, signal, signal_type, sparkline, updated_at)
+        VALUES
+            (:crypto, :name, :price, :change_24h, :change_7d, :rsi, :signal, :signal_type, :sparkline, :updated_at)
+    ''', rows)
+    # Retirer les cryptos qui ne sont plus suivies
+    placeholders = ','.join('?' * len(cryptos))
+    if cryptos:
+        conn.execute(f'DELETE FROM market_summary WHERE crypto NOT IN ({placeholders})', list(cryptos))
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+def _summary_filters(search='', signal_type=None):
+    """Construit la clause WHERE des filtres de la table de synthèse"""
+    where, params = [], []
+    if search:
+        where.append('(crypto LIKE ? OR name LIKE ?)')
+        params += [f'%{search}%', f'%{search}%']
+    if signal_type:
+        where.append('signal_type = ?')
+        params.append(signal_type)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ''
+    return where_sql, params
+
+def count_summary_rows(search='', signal_type=None):
+    """Nombre de lignes de la table de synthèse après filtrage"""
+    where_sql, params = _summary_filters(search, signal_type)
+    conn = sqlite3.connect(DB_PATH)
+    init_summary_table(conn)
+    total = conn.execute(f'SELECT COUNT(*) FROM market_summary {where_sql}', params).fetchone()[0]
+    conn.close()
+    return total
+
+def get_summary_page(page=1, page_size=25, sort_by='Variation 24h', ascending=False,
+                     search='', signal_type=None, currency=None):
+    """Renvoie une page de la table de synthèse (tri, filtre et pagination côté SQL)
+
+    Les prix sont stockés en devise de base et convertis au dernier taux
+    connu ; le tri par prix reste valable puisque le taux est commun.
+    """
+    column = SORTABLE_COLUMNS.get(sort_by, 'change_24h')
+    direction = 'ASC' if ascending else 'DESC'
+    where_sql, params = _summary_filters(search, signal_type)
+
+    conn = sqlite3.connect(DB_PATH)
+    init_summary_table(conn)
+    offset = max(page - 1, 0) * page_size
+    df = pd.read_sql_query(
+        f'SELECT * FROM market_summary {where_sql} '
+        f'ORDER BY {column} {direction}, crypto LIMIT ? OFFSET ?',
+        conn, params=params + [page_size, offset]
+    )
+    conn.close()
+
+    rate = 1.0
+    if currency and currency != BASE_CURRENCY:
+        fx = get_fx_rates(currency)
+        if fx.empty:
+            raise ValueError(f"Aucun taux de change {BASE_CURRENCY.upper()}/{currency.upper()} en base")
+        rate = fx['rate'].iloc[-1]
+    df['price'] = df['price'] * rate
+
+    # Décoder les mini-courbes de la page uniquement
+    df['sparkline'] = df['sparkline'].apply(lambda s: [p * rate for p in json.loads(s)] if s else [])
+    return df
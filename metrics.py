@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import threading
+
+# Activé via la variable d'environnement CRYPTO_METRICS=1 ou metrics.enable()
+DEFAULT_ENABLED = os.environ.get('CRYPTO_METRICS', '0') == '1'
+ENABLED = DEFAULT_ENABLED
+
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+
+class _StageTimer:
+    """Mesure la durée d'une étape ; `rows` peut être renseigné dans le bloc"""
+    __slots__ = ('stage', 'rows', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.rows = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_stage(self.stage, time.perf_counter() - self.start, self.rows)
+        return False
+
+class _NullTimer:
+    """Timer sans effet utilisé quand les métriques sont désactivées"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    @property
+    def rows(self):
+        return None
+
+    @rows.setter
+    def rows(self, value):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def enable(flag=True):
+    """Active ou désactive la collecte des métriques"""
+    global ENABLED
+    ENABLED = flag
+
+def timed(stage):
+    """Context manager chronométrant une étape (coût quasi nul si désactivé)"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _StageTimer(stage)
+
+def record_stage(stage, seconds, rows=None):
+    """Enregistre une mesure de durée (et un nombre de lignes) pour une étape"""
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0, 'rows': 0}
+        stats['count'] += 1
+        stats['total'] += seconds
+        stats['last'] = seconds
+        stats['max'] = max(stats['max'], seconds)
+        if rows is not None:
+            stats['rows'] += rows
+
+def incr(name, value=1, **labels):
+    """Incrémente un compteur, éventuellement étiqueté (ex: cache='prices')"""
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def reset():
+    """Remet toutes les métriques à zéro"""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+def snapshot():
+    """Copie des métriques courantes : {'stages': {...}, 'counters': [...]}"""
+    with _lock:
+        stages = {stage: dict(stats) for stage, stats in _stages.items()}
+        counters = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in _counters.items()
+        ]
+    return {'stages': stages, 'counters': counters}
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in sorted(labels.items())) + '}'
+
+def to_prometheus(prefix='crypto'):
+    """Exporte les métriques au format texte Prometheus"""
+    data = snapshot()
+    lines = [f'# TYPE {prefix}_stage_seconds summary']
+    for stage, stats in sorted(data['stages'].items()):
+        labels = _format_labels({'stage': stage})
+        lines.append(f'{prefix}_stage_seconds_count{labels} {stats["count"]}')
+        lines.append(f'{prefix}_stage_seconds_sum{labels} {stats["total"]:.6f}')
+    lines.append(f'# TYPE {prefix}_stage_seconds_max gauge')
+    for stage, stats in sorted(data['stages'].items()):
+        lines.append(f'{prefix}_stage_seconds_max{_format_labels({"stage": stage})} {stats["max"]:.6f}')
+    lines.append(f'# TYPE {prefix}_stage_rows_total counter')
+    for stage, stats in sorted(data['stages'].items()):
+        lines.append(f'{prefix}_stage_rows_total{_format_labels({"stage": stage})} {stats["rows"]}')
+
+    names = sorted({c['name'] for c in data['counters']})
+    for name in names:
+        lines.append(f'# TYPE {prefix}_{name}_total counter')
+        for counter in data['counters']:
+            if counter['name'] == name:
+                lines.append(f'{prefix}_{name}_total{_format_labels(counter["labels"])} {counter["value"]}')
+    return '\n'.join(lines) + '\n'
+
+def to_jsonl():
+    """Exporte les métriques en JSONL (une ligne par étape / compteur)"""
+    data = snapshot()
+    now = time.time()
+    lines = []
+    for stage, stats in sorted(data['stages'].items()):
+        lines.append(json.dumps({'time': now, 'type': 'stage', 'stage': stage, **stats}))
+    for counter in data['counters']:
+        lines.append(json.dumps({'time': now, 'type': 'counter', **counter}))
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+def export_jsonl(path='metrics.jsonl'):
+    """Ajoute l'état courant des métriques à un fichier JSONL"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(to_jsonl())
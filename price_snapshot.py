@@ -0,0 +1,202 @@
+"""Instantané partagé des prix récents, publié par le collecteur
+
+Après chaque cycle d'ingestion, le collecteur écrit les `days` derniers
+jours de prix de chaque crypto dans un fichier binaire immuable (en-tête
+JSON puis tableaux timestamp/id/prix contigus, triés par crypto puis par
+date), remplacé atomiquement via os.replace. Chaque processus du
+dashboard le projette en mémoire (mmap) et lit les séries sans copie ni
+parsing de dates ; seules les plages antérieures à l'instantané passent
+encore par SQLite.
+
+Un lecteur qui tient encore l'ancien fichier le garde intact jusqu'à ce
+qu'il le relâche : une version publiée n'est jamais modifiée.
+"""
+import datetime
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import numpy as np
+import pandas as pd
+import metrics
+from config import DB_PATH, load_config
+
+SNAPSHOT = load_config().get('snapshot', {})
+ENABLED = SNAPSHOT.get('enabled', True)
+# À côté de la base par défaut (suit CRYPTO_DB_PATH pour les tests de charge)
+SNAPSHOT_PATH = os.environ.get('CRYPTO_SNAPSHOT_PATH') or SNAPSHOT.get('path') or DB_PATH + '.snapshot'
+SNAPSHOT_DAYS = SNAPSHOT.get('days', 7)
+
+MAGIC = b'CRYSNAP1'
+_HEADER_LENGTH = struct.Struct('<Q')
+# Alignement des tableaux dans le fichier
+_ALIGN = 64
+
+_COLUMNS = (('timestamp', 'datetime64[us]'), ('id', 'int64'), ('price', 'float64'))
+
+# Cryptos présentes, par sauts dans l'index (crypto, timestamp) plutôt qu'un parcours complet
+_CRYPTOS_QUERY = '''
+    WITH RECURSIVE cryptos(crypto) AS (
+        SELECT MIN(crypto) FROM prices
+        UNION ALL
+        SELECT (SELECT MIN(crypto) FROM prices WHERE crypto > cryptos.crypto) FROM cryptos WHERE crypto IS NOT NULL
+    )
+    SELECT crypto FROM cryptos WHERE crypto IS NOT NULL
+'''
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+def _read_header(buffer):
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("fichier d'instantané invalide")
+    (length,) = _HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    return json.loads(bytes(buffer[start:start + length]))
+
+def publish_snapshot(db_path=DB_PATH, path=SNAPSHOT_PATH, days=SNAPSHOT_DAYS, now=None):
+    """Écrit un nouvel instantané des `days` derniers jours ; renvoie sa version (None si désactivé)
+
+    La version (date de publication et processus éditeur) ne se répète pas,
+    même si le fichier est supprimé ou si deux processus publient à la fois.
+    """
+    if not ENABLED:
+        return None
+    now = now or datetime.datetime.now()
+    # Borne au jour près : se compare correctement quel que soit le séparateur ('T' ou espace)
+    start_day = (now - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+
+    with metrics.timed('snapshot.sql') as t:
+        conn = sqlite3.connect(db_path)
+        rows, first = [], {}
+        try:
+            # Requêtes par crypto : chacune lit une plage de l'index (crypto, timestamp)
+            for (crypto,) in conn.execute(_CRYPTOS_QUERY).fetchall():
+                rows.extend(conn.execute('SELECT id, crypto, price, timestamp FROM prices WHERE crypto = ? AND timestamp >= ?',
+                                         (crypto, start_day)).fetchall())
+                first[crypto] = conn.execute('SELECT MIN(timestamp) FROM prices WHERE crypto = ?', (crypto,)).fetchone()[0]
+        except sqlite3.OperationalError:
+            # Table pas encore créée par le collecteur
+            pass
+        finally:
+            conn.close()
+        df = pd.DataFrame(rows, columns=['id', 'crypto', 'price', 'timestamp'])
+        t.rows = len(df)
+
+    with metrics.timed('snapshot.write') as t:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601').astype('datetime64[us]')
+        df = df.sort_values(['crypto', 'timestamp'], kind='stable').reset_index(drop=True)
+        cryptos, offsets, counts = np.unique(df['crypto'].to_numpy(dtype=str), return_index=True, return_counts=True)
+
+        header = {
+            'published_at': datetime.datetime.now().isoformat(),
+            'publisher': os.getpid(),
+            'start': start_day,
+            'count': len(df),
+            # complete : aucun prix plus ancien en base, l'instantané suffit pour tout l'historique
+            'assets': {crypto: {'offset': int(offset), 'count': int(count),
+                                'complete': str(first.get(crypto, ''))[:10] >= start_day}
+                       for crypto, offset, count in zip(cryptos.tolist(), offsets, counts)},
+        }
+        arrays = [df[name].to_numpy(dtype=dtype) for name, dtype in _COLUMNS]
+        # Les positions dépendent de la longueur de l'en-tête : deux passes suffisent
+        header['columns'] = {}
+        for _ in range(2):
+            encoded = json.dumps(header).encode()
+            offset = _aligned(len(MAGIC) + _HEADER_LENGTH.size + len(encoded))
+            for (name, _dtype), array in zip(_COLUMNS, arrays):
+                header['columns'][name] = offset
+                offset = _aligned(offset + array.nbytes)
+        encoded = json.dumps(header).encode()
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + _HEADER_LENGTH.pack(len(encoded)) + encoded)
+            for (name, _dtype), array in zip(_COLUMNS, arrays):
+                f.write(b'\0' * (header['columns'][name] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+        t.rows = len(df)
+    return _version(header)
+
+def _version(header):
+    return f"{header['published_at']}/{header['publisher']}"
+
+class PriceSnapshot:
+    """Instantané projeté en mémoire ; les séries sont des vues sur le fichier"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = _read_header(self._mmap)
+        self.version = _version(self.header)
+        self.start_day = self.header['start']
+        self.start = pd.Timestamp(self.start_day)
+        self.assets = self.header['assets']
+        count = self.header['count']
+        self._arrays = {
+            name: np.frombuffer(self._mmap, dtype=dtype, count=count, offset=self.header['columns'][name])
+            for name, dtype in _COLUMNS
+        }
+
+    def is_complete(self, crypto):
+        """Vrai si l'instantané contient tout l'historique de `crypto`"""
+        return crypto in self.assets and self.assets[crypto]['complete']
+
+    def covers(self, crypto, start):
+        """Vrai si les prix de `crypto` à partir de `start` sont tous dans l'instantané"""
+        return crypto in self.assets and (start >= self.start or self.assets[crypto]['complete'])
+
+    def bounds(self, crypto):
+        """(premier, dernier) timestamp de `crypto` dans l'instantané"""
+        asset = self.assets[crypto]
+        timestamps = self._arrays['timestamp']
+        return (pd.Timestamp(timestamps[asset['offset']]),
+                pd.Timestamp(timestamps[asset['offset'] + asset['count'] - 1]))
+
+    def frame(self, crypto, start=None, end=None):
+        """Prix de `crypto` entre start et end inclus, sans copie des tableaux (colonnes de la table prices)"""
+        asset = self.assets[crypto]
+        lo, hi = asset['offset'], asset['offset'] + asset['count']
+        timestamps = self._arrays['timestamp'][lo:hi]
+        if start is not None:
+            lo += int(np.searchsorted(timestamps, np.datetime64(start, 'us'), side='left'))
+        if end is not None:
+            hi = asset['offset'] + int(np.searchsorted(timestamps, np.datetime64(end, 'us'), side='right'))
+        return pd.DataFrame({
+            'id': self._arrays['id'][lo:hi],
+            'crypto': crypto,
+            'price': self._arrays['price'][lo:hi],
+            'timestamp': self._arrays['timestamp'][lo:hi],
+        }, copy=False)
+
+_lock = threading.Lock()
+_current = None
+_current_key = None
+
+def get_snapshot(path=SNAPSHOT_PATH):
+    """Instantané courant, re-projeté quand le collecteur en publie un nouveau ; None si absent"""
+    global _current, _current_key
+    if not ENABLED:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key != _current_key:
+            try:
+                _current = PriceSnapshot(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Instantané {path} illisible, lecture SQLite : {e}")
+                _current = None
+            _current_key = key
+        return _current
+
+def snapshot_version(path=SNAPSHOT_PATH):
+    """Version de l'instantané courant (None si absent), utilisable comme clé de cache"""
+    snapshot = get_snapshot(path)
+    return snapshot.version if snapshot is not None else None
@@ -0,0 +1,195 @@
+"""Rétention par paliers et compaction en ligne de la table `prices`
+
+Politique (section `retention` de config.yaml) :
+- pleine résolution pendant `raw_days` jours,
+- un prix par heure jusqu'à `hourly_days` jours,
+- un prix par jour au-delà.
+
+Chaque seau (heure ou jour) est réduit à son dernier prix, qui garde son
+horodatage d'origine. Le travail se fait par tranches d'un jour, chacune
+dans sa propre transaction courte, pour ne jamais bloquer longtemps le
+collecteur ou le dashboard ; l'espace libéré est ensuite rendu au système
+par `PRAGMA incremental_vacuum`.
+
+Un filigrane par crypto et par palier (table `retention_progress`) retient
+jusqu'où la compaction est faite : un passage ne visite que les jours
+passés sous un seuil depuis le précédent, plus ceux qui ont reçu des
+lignes depuis (rattrapage d'anciens trous).
+
+    python retention.py            # compaction + rapport avant/après
+    python retention.py --dry-run  # rapport seul
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import statistics
+import time
+from config import DB_PATH, load_config
+
+RETENTION = load_config().get('retention', {})
+RAW_DAYS = RETENTION.get('raw_days', 7)
+HOURLY_DAYS = RETENTION.get('hourly_days', 90)
+VACUUM_PAGES = RETENTION.get('vacuum_pages', 500)
+CHUNK_PAUSE = RETENTION.get('chunk_pause', 0.01)
+
+def _day(dt):
+    return dt.strftime('%Y-%m-%d')
+
+def init_retention_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS retention_progress (
+            crypto TEXT,
+            tier TEXT,
+            compacted_until TEXT,
+            last_id INTEGER,
+            PRIMARY KEY (crypto, tier)
+        )
+    ''')
+
+def compact_day(conn, crypto, day, bucket_seconds):
+    """Réduit les prix d'un jour à un prix par seau ; renvoie le nombre de lignes supprimées
+
+    Seule la dernière ligne de chaque seau est gardée, avec son vrai
+    timestamp : la série n'est pas décalée et rien n'est réinséré. Les
+    bornes au jour près se comparent correctement quel que soit le
+    séparateur des timestamps texte ('T' ou espace). Un jour qui n'a déjà
+    qu'une ligne par seau est lu sans ouvrir de transaction d'écriture.
+    """
+    next_day = _day(datetime.datetime.strptime(day, '%Y-%m-%d') + datetime.timedelta(days=1))
+    rows = conn.execute('''
+        SELECT id, CAST(strftime('%s', timestamp) AS INTEGER) AS ts
+        FROM prices
+        WHERE crypto = ? AND timestamp >= ? AND timestamp < ?
+        ORDER BY julianday(timestamp), id
+    ''', (crypto, day, next_day)).fetchall()
+
+    # Les lignes arrivent dans l'ordre chronologique : la dernière vue par seau est gardée
+    kept = {}
+    for row_id, ts in rows:
+        kept[ts - ts % bucket_seconds] = row_id
+    if len(kept) == len(rows):
+        return 0
+    keep_ids = set(kept.values())
+    delete_ids = [(row_id,) for row_id, _ in rows if row_id not in keep_ids]
+
+    # Suppression par id : une ligne arrivée depuis la lecture est traitée au passage suivant
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany('DELETE FROM prices WHERE id = ?', delete_ids)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return len(delete_ids)
+
+def _pending_days(start, end, touched, floor=''):
+    """Jours de [start, end), plus les jours modifiés de [floor, start) déjà compactés"""
+    days = {day for day in touched if floor <= day < end}
+    day = datetime.datetime.strptime(start, '%Y-%m-%d')
+    while _day(day) < end:
+        days.add(_day(day))
+        day += datetime.timedelta(days=1)
+    return sorted(days)
+
+def compact(db_path=DB_PATH, now=None, raw_days=RAW_DAYS, hourly_days=HOURLY_DAYS, pause=CHUNK_PAUSE):
+    """Applique la politique de rétention à toutes les cryptos ; renvoie le nombre de lignes supprimées"""
+    now = now or datetime.datetime.now()
+    raw_cutoff = now - datetime.timedelta(days=raw_days)
+    hourly_cutoff = now - datetime.timedelta(days=hourly_days)
+
+    # Seuls les jours entièrement passés sous un seuil sont compactés (fins exclusives)
+    daily_end, hourly_end = _day(hourly_cutoff), _day(raw_cutoff)
+
+    # isolation_level=None : transactions gérées explicitement, une par tranche
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    init_retention_table(conn)
+    progress = {(crypto, tier): (until, last_id) for crypto, tier, until, last_id
+                in conn.execute('SELECT crypto, tier, compacted_until, last_id FROM retention_progress')}
+    max_id = conn.execute('SELECT MAX(id) FROM prices').fetchone()[0] or 0
+
+    # Jours ayant reçu des lignes depuis le dernier passage (parcours de la clé primaire)
+    touched = {}
+    if progress:
+        since = min(last_id for _, last_id in progress.values())
+        for crypto, day in conn.execute('SELECT DISTINCT crypto, substr(timestamp, 1, 10) FROM prices WHERE id > ?',
+                                        (since,)):
+            touched.setdefault(crypto, set()).add(day)
+
+    removed = 0
+    for crypto, first in conn.execute('SELECT crypto, MIN(timestamp) FROM prices GROUP BY crypto').fetchall():
+        deleted = 0
+        for tier, bucket, floor, end in (('daily', 86400, '', daily_end), ('hourly', 3600, daily_end, hourly_end)):
+            start = max(progress.get((crypto, tier), (first[:10],))[0], floor)
+            for day in _pending_days(start, end, touched.get(crypto, ()), floor):
+                day_deleted = compact_day(conn, crypto, day, bucket)
+                deleted += day_deleted
+                if day_deleted and pause:
+                    time.sleep(pause)
+            conn.execute('INSERT OR REPLACE INTO retention_progress VALUES (?, ?, ?, ?)',
+                         (crypto, tier, max(start, end), max_id))
+        removed += deleted
+        if deleted:
+            print(f"✅ {crypto} compacté ({deleted} lignes)")
+    conn.close()
+    return removed
+
+def incremental_vacuum(db_path=DB_PATH, pages=VACUUM_PAGES):
+    """Rend au système les pages libres, par petits lots
+
+    La première fois, la base doit passer en auto_vacuum=INCREMENTAL, ce
+    qui demande un VACUUM complet unique.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        print("ℹ️ Activation de auto_vacuum=INCREMENTAL (VACUUM complet unique)...")
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    while conn.execute('PRAGMA freelist_count').fetchone()[0] > 0:
+        conn.execute(f'PRAGMA incremental_vacuum({int(pages)})')
+        time.sleep(CHUNK_PAUSE)
+    conn.close()
+
+def db_report(db_path=DB_PATH, repeat=5):
+    """Taille de la base, nombre de lignes et latence de lecture d'une série complète"""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0]
+    cryptos = [row[0] for row in conn.execute('SELECT DISTINCT crypto FROM prices')]
+    latencies = []
+    for _ in range(repeat):
+        for crypto in cryptos:
+            start = time.perf_counter()
+            conn.execute('SELECT * FROM prices WHERE crypto = ? ORDER BY timestamp', (crypto,)).fetchall()
+            latencies.append(time.perf_counter() - start)
+    conn.close()
+    return {
+        'size_kb': os.path.getsize(db_path) / 1024,
+        'rows': rows,
+        'query_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+    }
+
+def _print_report(label, report):
+    print(f"{label} : {report['size_kb']:,.0f} Ko, {report['rows']} lignes, "
+          f"lecture d'une série {report['query_ms']:.2f} ms (médiane)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--now', help='date de référence ISO (par défaut maintenant)')
+    parser.add_argument('--raw-days', type=float, default=RAW_DAYS)
+    parser.add_argument('--hourly-days', type=float, default=HOURLY_DAYS)
+    parser.add_argument('--dry-run', action='store_true', help='rapport seul, sans compaction')
+    args = parser.parse_args()
+
+    before = db_report(args.db)
+    _print_report("Avant", before)
+    if args.dry_run:
+        return
+    now = datetime.datetime.fromisoformat(args.now) if args.now else None
+    removed = compact(args.db, now, args.raw_days, args.hourly_days)
+    incremental_vacuum(args.db)
+    print(f"🧹 {removed} lignes supprimées")
+    _print_report("Après", db_report(args.db))
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,237 @@
 import pandas as pd
 import numpy as np
 import sqlite3
+import metrics
+from config import DB_PATH, load_config
+from price_snapshot import get_snapshot
 
-def get_price_data(crypto='bitcoin'):
-    """Récupère les données de prix d'une crypto"""
-    conn = sqlite3.connect('crypto_data.db')
-    df = pd.read_sql_query(f"SELECT * FROM prices WHERE crypto='{crypto}' ORDER BY timestamp", conn)
+# Devise de stockage des prix ; les autres devises sont converties à la lecture
+BASE_CURRENCY = load_config().get('base_currency', 'eur')
+# Écart maximal (s) entre un prix et le premier taux connu quand aucun taux ne le précède
+FX_TOLERANCE = 86400
+
+def get_fx_rates(currency):
+    """Série des taux de change (unités de `currency` pour 1 unité de la devise de base)"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        fx = pd.read_sql_query(
+            'SELECT timestamp, rate FROM fx_rates WHERE currency = ? ORDER BY timestamp',
+            conn, params=(currency,)
+        )
+    except pd.errors.DatabaseError:
+        # Table pas encore créée par le collecteur
+        fx = pd.DataFrame(columns=['timestamp', 'rate'])
     conn.close()
+    fx['timestamp'] = pd.to_datetime(fx['timestamp'], unit='s')
+    return fx
+
+def has_fx_rates(currency):
+    """Indique si des prix peuvent être affichés dans `currency`"""
+    return currency == BASE_CURRENCY or not get_fx_rates(currency).empty
+
+def convert_currency(df, currency=None, columns=('price', 'open', 'high', 'low')):
+    """Convertit les prix (stockés en devise de base) dans `currency`
+
+    Jointure « as-of » vectorisée : chaque prix prend le dernier taux connu
+    à son horodatage. Un prix antérieur au premier taux n'est converti
+    qu'à moins de FX_TOLERANCE de celui-ci ; au-delà il devient NaN plutôt
+    que d'être converti à un taux d'une autre époque (le collecteur
+    rattrape les taux jusqu'au plus ancien prix stocké).
+    """
+    if currency is None or currency == BASE_CURRENCY or df.empty:
+        return df
+    fx = get_fx_rates(currency)
+    if fx.empty:
+        raise ValueError(f"Aucun taux de change {BASE_CURRENCY.upper()}/{currency.upper()} en base")
+
+    with metrics.timed('price_data.fx_convert') as t:
+        timestamps = df['timestamp'].astype('datetime64[ns]').to_numpy()
+        fx_times = fx['timestamp'].astype('datetime64[ns]').to_numpy()
+        position = np.searchsorted(fx_times, timestamps, side='right') - 1
+        rates = fx['rate'].to_numpy()[np.clip(position, 0, len(fx) - 1)]
+        uncovered = timestamps < fx_times[0] - np.timedelta64(FX_TOLERANCE, 's')
+        if uncovered.any():
+            rates = np.where(uncovered, np.nan, rates)
+            print(f"⚠️ {int(uncovered.sum())} prix antérieurs au premier taux "
+                  f"{BASE_CURRENCY.upper()}/{currency.upper()} non convertis")
+        df = df.copy()
+        for column in columns:
+            if column in df:
+                df[column] = df[column].to_numpy() * rates
+        t.rows = len(df)
+    return df
+
+def get_price_data(crypto='bitcoin', currency=None):
+    """Récupère les données de prix d'une crypto
+
+    Les prix récents sont lus sans copie dans l'instantané partagé publié
+    par le collecteur ; SQLite ne sert que pour l'historique antérieur.
+    """
+    snapshot = get_snapshot()
+    recent = None
+    if snapshot is not None and crypto in snapshot.assets:
+        with metrics.timed('price_data.snapshot') as t:
+            recent = snapshot.frame(crypto)
+            t.rows = len(recent)
+        if snapshot.is_complete(crypto):
+            return convert_currency(recent, currency)
+
+    with metrics.timed('price_data.sql') as t:
+        conn = sqlite3.connect(DB_PATH)
+        if recent is None:
+            df = pd.read_sql_query('SELECT * FROM prices WHERE crypto = ? ORDER BY timestamp', conn, params=(crypto,))
+        else:
+            df = pd.read_sql_query('SELECT * FROM prices WHERE crypto = ? AND timestamp < ? ORDER BY timestamp',
+                                   conn, params=(crypto, snapshot.start_day))
+        conn.close()
+        t.rows = len(df)
     
     if df.empty:
-        return df
+        return df if recent is None else convert_currency(recent, currency)
     
     # Convertir en datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'], format='mixed')
-    return df
+    with metrics.timed('price_data.parse_datetime') as t:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='mixed')
+        t.rows = len(df)
+    if recent is not None:
+        df = pd.concat([df, recent], ignore_index=True)
+    return convert_currency(df, currency)
+
+# Niveaux de détail du graphique : (libellé, règle pandas, secondes par bougie)
+RESOLUTIONS = [
+    ('brut', None, 0),
+    ('15 min', '15min', 900),
+    ('1 h', '1h', 3600),
+    ('4 h', '4h', 14400),
+    ('1 jour', '1D', 86400),
+    ('1 semaine', '7D', 604800),
+]
+
+# Fenêtres affichées en ticks bruts en dessous de cette durée
+RAW_MAX_SPAN = pd.Timedelta(days=2)
+
+# Nombre de points visé par fenêtre (coût de rendu quasi constant)
+TARGET_POINTS = 1000
+
+# Bougies supplémentaires chargées avant la fenêtre pour amorcer la MA200
+INDICATOR_WARMUP = 200
+
+# Fenêtre des métriques et signaux du moment (Prix Max/Min, tendance 30j)
+RECENT_SPAN = pd.Timedelta(days=30)
+
+def get_price_bounds(crypto='bitcoin'):
+    """Renvoie (premier, dernier) timestamp disponibles pour une crypto"""
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.is_complete(crypto):
+        return snapshot.bounds(crypto)
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute('SELECT MIN(timestamp), MAX(timestamp) FROM prices WHERE crypto = ?', (crypto,)).fetchone()
+    conn.close()
+    if row[0] is None:
+        return None, None
+    return pd.to_datetime(row[0], format='mixed'), pd.to_datetime(row[1], format='mixed')
+
+def choose_resolution(start, end, target_points=TARGET_POINTS):
+    """Choisit la résolution la plus fine qui garde la fenêtre sous target_points"""
+    span = end - start
+    if span <= RAW_MAX_SPAN:
+        return RESOLUTIONS[0]
+    for resolution in RESOLUTIONS[1:]:
+        if span.total_seconds() / resolution[2] <= target_points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+def get_price_window(crypto, start, end, resolution=None, warmup=0, currency=None):
+    """Charge uniquement la tranche [start, end] et l'agrège en bougies OHLC
+
+    Les timestamps sont stockés en texte avec deux séparateurs ('T' ou
+    espace) : la requête filtre donc sur des bornes au jour près, qui se
+    comparent correctement quel que soit le format, puis le filtrage exact
+    se fait après conversion. Les jours couverts par l'instantané partagé
+    ne sont pas relus dans SQLite.
+    """
+    if resolution is None:
+        resolution = choose_resolution(start, end)
+    label, rule, seconds = resolution
+    # En ticks bruts l'amorçage est exprimé en durée plutôt qu'en bougies
+    warmup_span = pd.Timedelta(seconds=seconds * warmup) if seconds else (RAW_MAX_SPAN if warmup else pd.Timedelta(0))
+    query_start = start - warmup_span
+
+    # Partie couverte par l'instantané partagé : vue sans copie, déjà triée et convertie
+    snapshot = get_snapshot()
+    recent = None
+    if snapshot is not None and crypto in snapshot.assets:
+        with metrics.timed('price_window.snapshot') as t:
+            recent = snapshot.frame(crypto, query_start, end)[['timestamp', 'price']]
+            t.rows = len(recent)
+
+    if recent is not None and snapshot.covers(crypto, query_start):
+        df = recent
+    else:
+        query_end = (end + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        if recent is not None:
+            query_end = min(query_end, snapshot.start_day)
+        with metrics.timed('price_window.sql') as t:
+            conn = sqlite3.connect(DB_PATH)
+            df = pd.read_sql_query(
+                'SELECT timestamp, price FROM prices WHERE crypto = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp',
+                conn,
+                params=(crypto, query_start.strftime('%Y-%m-%d'), query_end)
+            )
+            conn.close()
+            t.rows = len(df)
+
+        if not df.empty:
+            with metrics.timed('price_window.parse_datetime') as t:
+                df['timestamp'] = pd.to_datetime(df['timestamp'], format='mixed')
+                df = df[(df['timestamp'] >= query_start) & (df['timestamp'] <= end)].sort_values('timestamp')
+                t.rows = len(df)
+        if recent is not None:
+            df = pd.concat([df, recent], ignore_index=True) if not df.empty else recent
+
+    if df.empty:
+        return df
+
+    with metrics.timed('price_window.resample') as t:
+        if rule is not None:
+            candles = df.set_index('timestamp')['price'].resample(rule).agg(['first', 'max', 'min', 'last']).dropna()
+            candles.columns = ['open', 'high', 'low', 'price']
+            df = candles.reset_index()
+        t.rows = len(df)
+    return convert_currency(df.reset_index(drop=True), currency)
+
+def get_window_indicators(crypto, start, end, target_points=TARGET_POINTS, currency=None, resolution=None):
+    """Prix et indicateurs d'une fenêtre, à la résolution adaptée au zoom
+
+    Retourne (df, indicators, libellé de résolution) ou None si la fenêtre est vide.
+    """
+    resolution = resolution or choose_resolution(start, end, target_points)
+    df = get_price_window(crypto, start, end, resolution, warmup=INDICATOR_WARMUP, currency=currency)
+    if df.empty:
+        return None
+
+    with metrics.timed('indicators.compute') as t:
+        indicators = compute_indicators(df)
+        t.rows = len(df)
+
+    # Retirer les bougies d'amorçage une fois les indicateurs calculés
+    visible = (df['timestamp'] >= start).to_numpy()
+    df = df[visible].reset_index(drop=True)
+    indicators = {key: series[visible].reset_index(drop=True) for key, series in indicators.items()}
+    return df, indicators, resolution[0]
+
+def get_recent_indicators(crypto='bitcoin', currency=None, span=RECENT_SPAN):
+    """Prix bruts et indicateurs des `span` derniers jours de données
+
+    Sert aux métriques et signaux du moment (max/min, tendance, RSI
+    actuel) : le coût ne dépend pas de la profondeur de l'historique.
+    Retourne (df, indicators) ou None si aucune donnée.
+    """
+    _first, last = get_price_bounds(crypto)
+    if last is None:
+        return None
+    result = get_window_indicators(crypto, last - span, last, currency=currency, resolution=RESOLUTIONS[0])
+    return None if result is None else result[:2]
 
 def calculate_rsi(data, period=14):
     """Calcule le RSI (Relative Strength Index)"""
@@ -100,13 +318,20 @@ def calculate_volume_sma(data, period=20):
     volatility = data['price'].pct_change().rolling(window=period).std() * 100
     return volatility
 
-def get_all_indicators(crypto='bitcoin'):
+def get_all_indicators(crypto='bitcoin', currency=None):
     """Calcule tous les indicateurs pour une crypto"""
-    df = get_price_data(crypto)
+    df = get_price_data(crypto, currency)
     
     if df.empty:
         return None
     
+    with metrics.timed('indicators.compute') as t:
+        indicators = compute_indicators(df)
+        t.rows = len(df)
+    return df, indicators
+
+def compute_indicators(df):
+    """Calcule le dictionnaire d'indicateurs à partir d'un DataFrame de prix"""
     indicators = {}
     
     # RSI
@@ -134,10 +359,14 @@ def get_all_indicators(crypto='bitcoin'):
     # Volatilité (simulant le volume)
     indicators['volatility'] = calculate_volume_sma(df)
     
-    return df, indicators
+    return indicators
 
 def generate_signals(df, indicators):
     """Génère des signaux d'achat/vente"""
+    with metrics.timed('signals.generate'):
+        return _generate_signals(df, indicators)
+
+def _generate_signals(df, indicators):
     signals = []
     current_price = df['price'].iloc[-1]
     current_rsi = indicators['rsi'].iloc[-1]
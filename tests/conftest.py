@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Les modules lisent la configuration et le chemin de la base à l'import :
+# config.yaml du dépôt, base et instantané jetables (crypto_data.db n'est jamais touchée)
+_tmp = tempfile.mkdtemp(prefix='crypto-tests-')
+os.environ.setdefault('CRYPTO_CONFIG', os.path.join(ROOT, 'config.yaml'))
+os.environ['CRYPTO_DB_PATH'] = os.path.join(_tmp, 'test.db')
+os.environ['CRYPTO_SNAPSHOT_PATH'] = os.path.join(_tmp, 'test.db.snapshot')
@@ -0,0 +1,65 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from backfill import _epoch, _inside_gaps, plan_requests, scan_gaps, split_gaps
+
+def ts(text):
+    return pd.Timestamp(text)
+
+DAY = pd.Timedelta(days=1)
+
+def test_close_gaps_share_one_request():
+    gaps = [(ts('2026-01-01'), ts('2026-01-02')), (ts('2026-01-10'), ts('2026-01-11')),
+            (ts('2026-03-01'), ts('2026-03-02'))]
+    requests = plan_requests(gaps, max_span=30 * DAY, min_span=2 * DAY)
+    assert [(start, end) for start, end, _ in requests] == [
+        (ts('2026-01-01'), ts('2026-01-11')), (ts('2026-02-28'), ts('2026-03-02'))]
+    assert [covered for _, _, covered in requests] == [gaps[:2], gaps[2:]]
+
+def test_long_gap_is_split():
+    requests = plan_requests([(ts('2026-01-01'), ts('2026-03-12'))], max_span=30 * DAY, min_span=2 * DAY)
+    assert [(start, end) for start, end, _ in requests] == [
+        (ts('2026-01-01'), ts('2026-01-31')), (ts('2026-01-31'), ts('2026-03-02')),
+        (ts('2026-03-02'), ts('2026-03-12'))]
+    for start, end, _ in requests:
+        assert end - start <= 30 * DAY
+
+def test_short_request_widened_into_the_past():
+    (start, end, covered), = plan_requests([(ts('2026-01-05 10:00'), ts('2026-01-05 14:00'))],
+                                           max_span=90 * DAY, min_span=91 * DAY)
+    assert (start, end) == (ts('2026-01-05 14:00') - 91 * DAY, ts('2026-01-05 14:00'))
+    assert covered == [(ts('2026-01-05 10:00'), ts('2026-01-05 14:00'))]
+
+def test_split_gaps_at_tier_boundary():
+    boundary = ts('2026-06-01')
+    gaps = [(ts('2026-01-01'), ts('2026-02-01')), (ts('2026-05-20'), ts('2026-06-10')),
+            (ts('2026-07-01'), ts('2026-07-02'))]
+    daily, hourly = split_gaps(gaps, boundary)
+    assert daily == [gaps[0], (ts('2026-05-20'), boundary)]
+    assert hourly == [(boundary, ts('2026-06-10')), gaps[2]]
+
+def test_inside_gaps_is_strict():
+    gaps = [(ts('2026-01-01 00:00'), ts('2026-01-01 05:00')), (ts('2026-01-02 00:00'), ts('2026-01-02 03:00'))]
+    hours = pd.date_range('2025-12-31 23:00', '2026-01-02 04:00', freq='1h')
+    timestamps_ms = np.array([_epoch(hour) * 1000 for hour in hours])
+    inside = hours[_inside_gaps(timestamps_ms, gaps)]
+    expected = pd.DatetimeIndex(list(pd.date_range('2026-01-01 01:00', '2026-01-01 04:00', freq='1h'))
+                                + list(pd.date_range('2026-01-02 01:00', '2026-01-02 02:00', freq='1h')))
+    assert inside.equals(expected)
+
+def test_scan_gaps_uses_tier_tolerance():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE prices (id INTEGER PRIMARY KEY, crypto TEXT, price REAL, timestamp TEXT)')
+    now = ts('2026-10-01 12:00')
+    # Palier journalier (daily), puis horaire avec un trou de 5 h ; séparateurs mélangés
+    daily = pd.date_range('2026-05-01', '2026-06-30', freq='1D')
+    hourly = pd.date_range('2026-07-04', '2026-10-01 12:00', freq='1h')
+    hourly = hourly[(hourly < ts('2026-08-01 10:00')) | (hourly > ts('2026-08-01 14:00'))]
+    rows = [('bitcoin', 1.0, t.isoformat(sep=' ' if i % 2 else 'T')) for i, t in enumerate(daily.append(hourly))]
+    conn.executemany('INSERT INTO prices (crypto, price, timestamp) VALUES (?, ?, ?)', rows)
+
+    gaps, last = scan_gaps(conn, 'bitcoin', now=now)
+    assert gaps == [(ts('2026-06-30'), ts('2026-07-04')), (ts('2026-08-01 09:00'), ts('2026-08-01 15:00'))]
+    assert last == ts('2026-10-01 12:00')
+    gaps, _ = scan_gaps(conn, 'bitcoin', since=ts('2026-07-10'), now=now)
+    assert gaps == [(ts('2026-08-01 09:00'), ts('2026-08-01 15:00'))]
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from correlation_matrix import RollingCorrelation
+
+ASSETS = ['a', 'b', 'c', 'd']
+
+def _prices(bars=300, seed=0):
+    """Prix horaires aléatoires avec des cotations manquantes"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, size=(bars, len(ASSETS))) + rng.normal(0, 0.01, size=(bars, 1))
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), columns=ASSETS,
+                          index=pd.date_range('2026-01-01', periods=bars, freq='1h'))
+    return prices.mask(rng.random(prices.shape) < 0.1)
+
+def _expected_returns(prices, window):
+    # Rendement par rapport au dernier prix connu de chaque crypto
+    return np.log(prices / prices.ffill().shift()).tail(window)
+
+@pytest.mark.parametrize('chunks', [1, 7, 300])
+def test_matches_pandas_after_incremental_updates(chunks):
+    prices = _prices()
+    engine = RollingCorrelation(ASSETS, window=100, bar='1h')
+    for part in np.array_split(np.arange(len(prices)), chunks):
+        engine.update(prices.iloc[part])
+
+    returns = _expected_returns(prices, 100)
+    pd.testing.assert_frame_equal(engine.correlation(min_periods=20), returns.corr(min_periods=20),
+                                  check_exact=False, atol=1e-10)
+    pd.testing.assert_frame_equal(engine.covariance(min_periods=20), returns.cov(min_periods=20),
+                                  check_exact=False, atol=1e-12)
+    expected_volatility = returns.std() * np.sqrt(engine.bars_per_year) * 100
+    pd.testing.assert_series_equal(engine.volatility(min_periods=20), expected_volatility,
+                                   check_exact=False, atol=1e-10)
+
+def test_already_integrated_bars_are_ignored():
+    prices = _prices(150)
+    engine = RollingCorrelation(ASSETS, window=50, bar='1h')
+    assert engine.update(prices.iloc[:100]) == 100
+    assert engine.update(prices.iloc[80:]) == 50
+    assert engine.update(prices.iloc[:100]) == 0
+    assert engine.count == 50
+    pd.testing.assert_frame_equal(engine.correlation(min_periods=10),
+                                  _expected_returns(prices, 50).corr(min_periods=10),
+                                  check_exact=False, atol=1e-10)
+
+def test_min_periods_hides_sparse_pairs():
+    prices = _prices(40)
+    prices['d'] = np.nan
+    engine = RollingCorrelation(ASSETS, window=40, bar='1h')
+    engine.update(prices)
+    correlation = engine.correlation(min_periods=10)
+    assert correlation['d'].isna().all()
+    assert np.isnan(engine.volatility(min_periods=10)['d'])
+    assert correlation.loc['a', 'a'] == pytest.approx(1.0)
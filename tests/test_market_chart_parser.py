@@ -0,0 +1,53 @@
+import datetime
+import json
+import time
+import numpy as np
+import pytest
+from market_chart_parser import parse_market_chart_stream, timestamps_to_iso
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize('size', [1, 7, 64, 1 << 20])
+def test_stream_parse_matches_json(size):
+    rng = np.random.default_rng(1)
+    pairs = [[1719194617001 + i * 3600000, float(p)] for i, p in enumerate(rng.uniform(0.01, 1e5, 500))]
+    body = json.dumps({'prices': pairs, 'market_caps': [[1, 2.0]], 'total_volumes': []}).encode()
+    timestamps, prices = parse_market_chart_stream(_chunks(body, size), capacity=16)
+    assert timestamps.tolist() == [t for t, _ in pairs]
+    assert prices.tolist() == [p for _, p in pairs]
+
+def test_stream_parse_empty_and_truncated():
+    timestamps, prices = parse_market_chart_stream([b'{"prices": [], "market_caps": []}'])
+    assert len(timestamps) == len(prices) == 0
+    with pytest.raises(ValueError):
+        parse_market_chart_stream(_chunks(b'{"prices": [[1719194617001, 1.5], [17191', 5))
+
+@pytest.fixture
+def local_zone(monkeypatch):
+    def use(zone):
+        monkeypatch.setenv('TZ', zone)
+        time.tzset()
+    yield use
+    monkeypatch.undo()
+    time.tzset()
+
+@pytest.mark.parametrize('zone', ['UTC', 'Europe/Paris', 'America/New_York', 'Australia/Lord_Howe'])
+def test_iso_matches_fromtimestamp_across_dst_changes(local_zone, zone):
+    local_zone(zone)
+    rng = np.random.default_rng(2)
+    start = int(datetime.datetime(2013, 1, 1, tzinfo=datetime.timezone.utc).timestamp() * 1000)
+    end = int(datetime.datetime(2026, 12, 31, tzinfo=datetime.timezone.utc).timestamp() * 1000)
+    timestamps = np.sort(rng.integers(start, end, 20000))
+    # Points entiers (sans millisecondes) : isoformat() omet alors les microsecondes
+    timestamps[::3] -= timestamps[::3] % 1000
+    expected = [datetime.datetime.fromtimestamp(ms // 1000).replace(microsecond=ms % 1000 * 1000).isoformat()
+                for ms in timestamps.tolist()]
+    assert timestamps_to_iso(timestamps).tolist() == expected
+
+def test_iso_around_a_dst_change(local_zone):
+    local_zone('Europe/Paris')
+    # Passage à l'heure d'été le 2025-03-30 à 01:00 UTC
+    change = int(datetime.datetime(2025, 3, 30, 1, tzinfo=datetime.timezone.utc).timestamp()) * 1000
+    iso = timestamps_to_iso(np.array([change - 1000, change, change + 1500]))
+    assert iso.tolist() == ['2025-03-30T01:59:59', '2025-03-30T03:00:00', '2025-03-30T03:00:01.500000']